@@ -15,3 +15,5 @@ from .topology import topology
 from .network import network
 from .node import node
 from .simulator import simulator
+from .results import loadResults, loadTable
+from .sweep import sweep, grid
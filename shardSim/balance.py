@@ -0,0 +1,132 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+from collections import deque
+
+
+from .checkpoint import packNode, unpackNode
+
+
+# Per node rows of the rank state and metrics that move with a node
+STATE_ROWS = ("time", "slot", "epoch", "seed", "committeeSeed", "miner", "val", "pending", "queued", "cost")
+METRIC_ROWS = ("sent", "recv", "blockDelays", "blockTimes", "duplicates", "dropped")
+
+
+##  This function chooses the nodes to migrate inside a group of ranks. The
+#   most loaded rank gives its most costly node that fits in half the gap
+#   to the least loaded rank, until the load of every rank is within the
+#   threshold of the mean or nothing fits. All the ranks of the group get
+#   the same plan from the same loads.
+#   @param  loads       List of (node costs, node IDs) of every rank.
+#   @param  capacity    Maximum number of nodes of a rank.
+#   @param  threshold   Tolerated load above the mean, as a fraction.
+#   @param  maxMoves    Maximum number of nodes migrated.
+#   @return List of (node ID, source index, target index) in the group.
+def planMoves(loads, capacity, threshold, maxMoves):
+    costs = [dict(zip(nodeIDs, nodeCosts)) for nodeCosts, nodeIDs in loads]
+    totals = [sum(c.values()) for c in costs]
+    mean = sum(totals) / max(len(totals), 1)
+    moves = []
+    moved = set()
+    while len(moves) < maxMoves:
+        heavy = max(range(len(totals)), key=lambda r: totals[r])
+        light = min(range(len(totals)), key=lambda r: totals[r])
+        if totals[heavy] <= mean * (1 + threshold) or len(costs[light]) >= capacity or len(costs[heavy]) <= 1:
+            break
+        gap = totals[heavy] - totals[light]
+        fits = [(cost, nodeID) for nodeID, cost in costs[heavy].items() if 0 < cost <= gap / 2 and nodeID not in moved]
+        if not fits:
+            break
+        cost, nodeID = max(fits)
+        moved.add(nodeID)
+        del costs[heavy][nodeID]
+        costs[light][nodeID] = cost
+        totals[heavy] -= cost
+        totals[light] += cost
+        moves.append((nodeID, heavy, light))
+    return moves
+
+
+##  This function takes a node out of its rank and returns everything
+#   needed to host it on another rank. The last node of the rank takes its
+#   place, so the nodes and their rows stay contiguous.
+def detach(net, n):
+    i = n.index
+    last = len(net.nodes) - 1
+    rows = dict((name, getattr(net.state, name)[i].copy()) for name in STATE_ROWS)
+    metricRows = dict((name, getattr(net.metrics, name)[i].copy()) for name in METRIC_ROWS)
+    package = (packNode(n), rows, metricRows, net.inbox.pop(n.nodeID), net.mining.remove(n))
+    if i != last:
+        moved = net.nodes[last]
+        for name in STATE_ROWS:
+            getattr(net.state, name)[i] = getattr(net.state, name)[last]
+        for name in METRIC_ROWS:
+            getattr(net.metrics, name)[i] = getattr(net.metrics, name)[last]
+        net.sends.backlog[i], net.sends.backlog[last] = net.sends.backlog[last], net.sends.backlog[i]
+        moved.index = i
+        net.nodes[i] = moved
+        net.nodeIDs[i] = moved.nodeID
+    for name in STATE_ROWS:
+        getattr(net.state, name)[last] = 0
+    for name in METRIC_ROWS:
+        getattr(net.metrics, name)[last] = 0
+    net.nodes.pop()
+    net.nodeIDs.pop()
+    del net.local[n.nodeID]
+    return package
+
+
+##  This function hosts a node detached from another rank.
+def attach(net, package):
+    attributes, rows, metricRows, inbox, nextBlock = package
+    n = unpackNode(net, attributes)
+    n.index = len(net.nodes)
+    for name in STATE_ROWS:
+        getattr(net.state, name)[n.index] = rows[name]
+    for name in METRIC_ROWS:
+        getattr(net.metrics, name)[n.index] = metricRows[name]
+    net.nodes.append(n)
+    net.nodeIDs.append(n.nodeID)
+    net.local[n.nodeID] = n
+    net.inbox[n.nodeID] = deque(inbox)
+    if nextBlock != None:
+        net.mining.add(n, nextBlock)
+    return n
+
+
+##  This function migrates nodes from the most loaded ranks to the least
+#   loaded ones, using the cost of the nodes measured since the last call.
+#   Nodes only move between ranks of the same shard. It must be called by
+#   all the ranks at the end of a tick, and returns the number of nodes
+#   migrated in the whole network.
+def rebalance(net):
+    config = net.config
+    topo = net.topo
+    net.quiesce()
+    group = topo.shardComm if topo.nbShards > 0 else topo.comm
+    ranks = topo.shardRanks if topo.nbShards > 0 else list(range(topo.nbRanks))
+    loads = group.allgather((net.state.cost[:len(net.nodes)].tolist(), list(net.nodeIDs)))
+    moves = planMoves(loads, config.maxNodesPerRank, config.rebalanceThreshold, config.maxMigrations)
+    me = group.Get_rank()
+    outgoing = [[] for r in ranks]
+    for nodeID, source, target in moves:
+        if source == me:
+            outgoing[target].append(detach(net, net.local[nodeID]))
+    for packages in group.alltoall(outgoing):
+        for package in packages:
+            attach(net, package)
+    migrated = topo.comm.allgather([(nodeID, ranks[target]) for nodeID, source, target in moves] if me == 0 else [])
+    for rankMoves in migrated:
+        for nodeID, rank in rankMoves:
+            net.location[nodeID] = rank
+    net.state.cost[:] = 0
+    return sum(len(rankMoves) for rankMoves in migrated)
@@ -13,20 +13,52 @@
 import random
 
 
+GENESIS_HASH = 0
+GENESIS_PARENT = int("11" * 32, 16)
+
+
+def newHash():
+    return random.getrandbits(64 * 4)
+
+
+##  Hashes are kept as integers, these functions format them for rendering.
+def hexHash(h):
+    return '0x%064x' % h
+
+
+def shortHash(h, digits=4):
+    return '%0*x' % (digits, h & ((1 << (4 * digits)) - 1))
+
+
 class block():
 
+    __slots__ = ("number", "hash", "parent", "miner", "time", "arrivalTime", "crosslinks")
+
     def __init__(self, parent, miner, time):
         if parent != None:
             self.number = parent.number + 1
-            self.hash = '0x%064x' % random.getrandbits(64 * 4)
+            self.hash = newHash()
             self.parent = parent.hash
             self.miner = miner
             self.time = time
         else:
             self.number = 7000000
-            self.hash = "0x0000000000000000000000000000000000000000000000000000000000000000"
-            self.parent = "0x1111111111111111111111111111111111111111111111111111111111111111"
+            self.hash = GENESIS_HASH
+            self.parent = GENESIS_PARENT
             self.miner = 0
             self.time = 0
+        self.arrivalTime = -1
+        self.crosslinks = ()
 
-
+    ##  This method returns a copy of the block, for messages that do not go
+    #   through the wire format.
+    def copy(self):
+        b = block.__new__(block)
+        b.number = self.number
+        b.hash = self.hash
+        b.parent = self.parent
+        b.miner = self.miner
+        b.time = self.time
+        b.arrivalTime = -1
+        b.crosslinks = self.crosslinks
+        return b
@@ -0,0 +1,139 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import numpy as np
+
+
+from .block import block
+
+
+# Layout of one block in a columnar chain
+CHAIN = np.dtype([("number", "i8"), ("hash", "V32"), ("parent", "V32"),
+                  ("miner", "i4"), ("time", "i4"), ("arrivalTime", "i4")])
+
+
+def newChain(config):
+    if config.chainBackend == "columnar":
+        return columnarChain()
+    return blockList()
+
+
+##  This class is the default chain backend: a list of blocks with an
+#   index from hash to block for O(1) membership tests.
+class blockList(list):
+
+    def __init__(self):
+        super().__init__()
+        self.index = {}
+
+    def append(self, b):
+        super().append(b)
+        self.index[b.hash] = b
+
+    def __setitem__(self, i, b):
+        del self.index[self[i].hash]
+        super().__setitem__(i, b)
+        self.index[b.hash] = b
+
+    def pop(self, i=-1):
+        b = super().pop(i)
+        del self.index[b.hash]
+        return b
+
+    def has(self, h):
+        return h in self.index
+
+    def get(self, h):
+        return self.index.get(h)
+
+    def columns(self):
+        data = np.zeros(len(self), dtype=CHAIN)
+        for i, b in enumerate(self):
+            data[i] = (b.number, b.hash.to_bytes(32, "big"), b.parent.to_bytes(32, "big"), b.miner, b.time, b.arrivalTime)
+        return data
+
+
+##  This class stores a chain as a NumPy structured array, one row per
+#   block. Blocks are materialized only when they are read, and the
+#   columns can be used directly for analysis and plots.
+class columnarChain():
+
+    def __init__(self, capacity=64):
+        self.data = np.zeros(capacity, dtype=CHAIN)
+        self.size = 0
+        self.index = {}
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self.read(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.read(j) for j in range(*i.indices(self.size))]
+        return self.read(self.position(i))
+
+    def __setitem__(self, i, b):
+        i = self.position(i)
+        del self.index[int.from_bytes(self.data["hash"][i].tobytes(), "big")]
+        self.write(i, b)
+
+    def position(self, i):
+        if i < 0:
+            i = i + self.size
+        if i < 0 or i >= self.size:
+            raise IndexError("chain index out of range")
+        return i
+
+    def read(self, i):
+        row = self.data[i]
+        b = block.__new__(block)
+        b.number = int(row["number"])
+        b.hash = int.from_bytes(row["hash"].tobytes(), "big")
+        b.parent = int.from_bytes(row["parent"].tobytes(), "big")
+        b.miner = int(row["miner"])
+        b.time = int(row["time"])
+        b.arrivalTime = int(row["arrivalTime"])
+        b.crosslinks = ()
+        return b
+
+    def write(self, i, b):
+        self.data[i] = (b.number, b.hash.to_bytes(32, "big"), b.parent.to_bytes(32, "big"), b.miner, b.time, b.arrivalTime)
+        self.index[b.hash] = i
+
+    def append(self, b):
+        if self.size == len(self.data):
+            self.data = np.resize(self.data, 2 * len(self.data))
+        self.write(self.size, b)
+        self.size += 1
+
+    def pop(self, i=-1):
+        if self.position(i) != self.size - 1:
+            raise IndexError("columnar chains can only pop the last block")
+        b = self.read(self.size - 1)
+        del self.index[b.hash]
+        self.size -= 1
+        return b
+
+    def has(self, h):
+        return h in self.index
+
+    def get(self, h):
+        i = self.index.get(h)
+        if i == None:
+            return None
+        return self.read(i)
+
+    def columns(self):
+        return self.data[:self.size]
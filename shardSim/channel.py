@@ -0,0 +1,127 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+from mpi4py import MPI
+import numpy as np
+
+
+from .wire import encode, decode, decodeAll, countAll, SIZE
+
+
+##  This class carries node messages over one MPI communicator, either the
+#   whole world or the sub-communicator of a shard. Ranks are always given
+#   as world ranks and translated to ranks of the communicator here.
+class channel():
+
+    ##  Constructor of the channel.
+    #   @param  comm    MPI communicator used by this channel.
+    #   @param  ranks   World rank of every rank of the communicator.
+    def __init__(self, comm, ranks):
+        self.comm = comm
+        self.ranks = list(ranks)
+        self.rankOf = dict((r, i) for i, r in enumerate(self.ranks))
+        self.nbRanks = len(self.ranks)
+        self.sentTo = [0] * self.nbRanks
+        self.recvFrom = [0] * self.nbRanks
+        self.outbox = [bytearray() for r in range(self.nbRanks)]
+        self.recvBuf = bytearray(SIZE)
+        self.accept = None
+
+    ##  This method queues a message in the buffer of the target rank. The
+    #   message is encoded right away, so later changes to the message
+    #   or its block do not leak into what the target receives.
+    def post(self, rank, target, message):
+        dest = self.rankOf[rank]
+        self.outbox[dest] += encode(target, message)
+        self.sentTo[dest] += 1
+
+    def isend(self, rank, target, message):
+        return self.isendBytes(rank, target, encode(target, message))
+
+    def isendBytes(self, rank, target, data):
+        dest = self.rankOf[rank]
+        self.sentTo[dest] += 1
+        return self.comm.Isend([data, MPI.BYTE], dest=dest, tag=target)
+
+    ##  This method receives every message already waiting for this rank,
+    #   whatever its target node, with matched probes so that each probed
+    #   message is the one received. Messages refused by the accept
+    #   function are not decoded.
+    def receiveAll(self):
+        received = []
+        status = MPI.Status()
+        while True:
+            matched = self.comm.improbe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
+            if matched == None:
+                return received
+            source = status.Get_source()
+            target, message = self.receiveMatched(matched, status)
+            if message != None:
+                received.append((self.ranks[source], target, message))
+
+    ##  This method receives a probed message into the receive buffer,
+    #   growing it for beacon blocks carrying crosslinks, and decodes it.
+    def receiveMatched(self, matched, status):
+        count = status.Get_count(MPI.BYTE)
+        if count > len(self.recvBuf):
+            self.recvBuf = bytearray(count)
+        matched.Recv([self.recvBuf, MPI.BYTE])
+        self.recvFrom[status.Get_source()] += 1
+        return decode(self.recvBuf, 0, self.accept)
+
+    ##  This method receives one message and returns the world rank of its
+    #   source, its target node and its content, or None if the message was
+    #   refused by the accept function of the channel.
+    def recv(self, source, tag, status=None):
+        if status == None:
+            status = MPI.Status()
+        matched = self.comm.mprobe(source=source, tag=tag, status=status)
+        target, message = self.receiveMatched(matched, status)
+        return self.ranks[source], target, message
+
+    ##  This method swaps the buffers of all ranks with a single Alltoallv
+    #   and returns the list of (source rank, target node, message) received.
+    def alltoall(self):
+        nbRanks = self.nbRanks
+        sendBufs = self.outbox
+        self.outbox = [bytearray() for r in range(nbRanks)]
+        sendCounts = np.array([len(buf) for buf in sendBufs], dtype="i")
+        recvCounts = np.empty(nbRanks, dtype="i")
+        self.comm.Alltoall(sendCounts, recvCounts)
+        sendDispls = np.zeros(nbRanks, dtype="i")
+        recvDispls = np.zeros(nbRanks, dtype="i")
+        sendDispls[1:] = np.cumsum(sendCounts)[:-1]
+        recvDispls[1:] = np.cumsum(recvCounts)[:-1]
+        sendBuf = np.frombuffer(b"".join(sendBufs), dtype="B")
+        recvBuf = np.empty(recvCounts.sum(), dtype="B")
+        self.comm.Alltoallv([sendBuf, (sendCounts, sendDispls), MPI.BYTE], [recvBuf, (recvCounts, recvDispls), MPI.BYTE])
+        received = []
+        for source in range(nbRanks):
+            if recvCounts[source] == 0:
+                continue
+            for target, message in decodeAll(recvBuf[recvDispls[source]:recvDispls[source]+recvCounts[source]], self.accept):
+                received.append((self.ranks[source], target, message))
+            self.recvFrom[source] += countAll(recvBuf[recvDispls[source]:recvDispls[source]+recvCounts[source]])
+        return received
+
+    ##  This method receives every point to point message sent to this rank
+    #   so far. Ranks exchange their cumulative send counts, so each rank
+    #   knows exactly how many messages to wait for.
+    def drain(self):
+        expected = self.comm.alltoall(self.sentTo)
+        received = []
+        for source in range(self.nbRanks):
+            while self.recvFrom[source] < expected[source]:
+                entry = self.recv(source, MPI.ANY_TAG)
+                if entry[2] != None:
+                    received.append(entry)
+        return received
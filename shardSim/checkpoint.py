@@ -0,0 +1,132 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import json, os, pickle, random
+
+
+from .node import node
+from .sends import sendQueue
+
+
+MANIFEST_FILE = "checkpoint.json"
+
+# Node attributes that are rebuilt on restart instead of being saved
+EXCLUDED = ("config", "topo", "net", "tracer", "state", "metrics", "timers")
+
+
+##  This function returns the directory of the checkpoint of a simulation
+#   at a given time.
+def checkpointPath(config, time):
+    return os.path.join(config.resultsDir, config.checkpointDir, "%s-t%d" % (config.simID, time))
+
+
+def rankFile(directory, rank):
+    return os.path.join(directory, "rank-%d.pkl" % rank)
+
+
+##  This function returns the attributes of a node that are saved, without
+#   the references to the objects of its rank.
+def packNode(n):
+    return dict((k, v) for k, v in n.__dict__.items() if k not in EXCLUDED)
+
+
+##  This function rebuilds a node of the rank from its saved attributes.
+def unpackNode(net, attributes):
+    n = node.__new__(node)
+    n.config = net.config
+    n.topo = net.topo
+    n.net = net
+    n.tracer = net.tracer
+    n.state = net.state
+    n.metrics = net.metrics
+    n.timers = net.timers
+    n.__dict__.update(attributes)
+    return n
+
+
+##  This function writes the state of all the nodes of every rank at the
+#   virtual time of the network, one file per rank. It is collective and
+#   must be called at the end of a tick or of an event window, when no
+#   event before that time is pending.
+#   @param  net         Network of the rank.
+#   @param  directory   Directory of the checkpoint.
+def writeCheckpoint(net, directory):
+    comm = net.topo.comm
+    net.quiesce()
+    net.tracer.flush()
+    net.results.flush()
+    if net.topo.rank == 0:
+        os.makedirs(directory, exist_ok=True)
+    comm.barrier()
+    index = dict((n.nodeID, i) for i, n in enumerate(net.nodes))
+    saved = {}
+    saved["time"] = net.time
+    saved["nodes"] = [packNode(n) for n in net.nodes]
+    saved["location"] = net.location
+    saved["state"] = net.state
+    saved["metrics"] = net.metrics
+    saved["inbox"] = net.inbox
+    saved["budget"] = net.budget
+    saved["events"] = [(time, count, index[n.nodeID], kind, data) for time, count, n, kind, data in net.events.heap]
+    saved["eventCount"] = net.events.count
+    saved["mining"] = (net.mining.heap, [index[n.nodeID] if n != None else -1 for n in net.mining.miners], net.mining.rng.get_state())
+    saved["epochs"] = net.epochs.epochs
+    saved["wheel"] = net.wheel
+    saved["edgeCut"] = net.edgeCut
+    saved["random"] = random.getstate()
+    with open(rankFile(directory, net.topo.rank), "wb") as f:
+        pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+    comm.barrier()
+    if net.topo.rank == 0:
+        manifest = {"simID": net.config.simID, "time": net.time, "ranks": net.topo.nbRanks,
+                    "nodesPerRank": net.config.nodesPerRank,
+                    "maxNodesPerRank": net.config.maxNodesPerRank, "eventDriven": net.config.eventDriven}
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=1)
+
+
+##  This function rebuilds the nodes of a rank from a checkpoint written
+#   with the same number of ranks and nodes per rank. The configuration of
+#   the new run is kept, so several scenarios can branch from one network.
+def readCheckpoint(net, directory):
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest["ranks"] != net.topo.nbRanks or manifest["nodesPerRank"] != net.config.nodesPerRank:
+        raise ValueError("Checkpoint %s was written with %d ranks of %d nodes" % (directory, manifest["ranks"], manifest["nodesPerRank"]))
+    if manifest.get("maxNodesPerRank", net.config.maxNodesPerRank) != net.config.maxNodesPerRank:
+        raise ValueError("Checkpoint %s was written with %d max nodes per rank" % (directory, manifest["maxNodesPerRank"]))
+    if manifest["eventDriven"] != net.config.eventDriven:
+        raise ValueError("Checkpoint %s was written by the other simulation engine" % directory)
+    with open(rankFile(directory, net.topo.rank), "rb") as f:
+        saved = pickle.load(f)
+    net.time = saved["time"]
+    net.state = saved["state"]
+    net.metrics = saved["metrics"]
+    net.sends = sendQueue(net.config, net)
+    net.location = saved["location"]
+    for attributes in saved["nodes"]:
+        n = unpackNode(net, attributes)
+        net.nodes.append(n)
+        net.nodeIDs.append(n.nodeID)
+        net.local[n.nodeID] = n
+    net.inbox = saved["inbox"]
+    net.budget = saved["budget"]
+    net.events.heap = [(time, count, net.nodes[i], kind, data) for time, count, i, kind, data in saved["events"]]
+    net.events.count = saved["eventCount"]
+    heap, miners, rngState = saved["mining"]
+    net.mining.heap = heap
+    net.mining.miners = [net.nodes[i] if i >= 0 else None for i in miners]
+    net.mining.rng.set_state(rngState)
+    net.epochs.epochs = saved["epochs"]
+    net.wheel = saved["wheel"]
+    net.edgeCut = saved["edgeCut"]
+    random.setstate(saved["random"])
@@ -16,7 +16,12 @@ from mpi4py import MPI
 
 class configuration():
 
-    def __init__(self):
+    ##  Constructor of the configuration.
+    #   @param  comm        Communicator of the simulation, COMM_WORLD by default.
+    #   @param  overrides   Dictionary of settings replacing the defaults.
+    def __init__(self, comm=None, overrides=None):
+        if comm == None:
+            comm = MPI.COMM_WORLD
         # Topology settings
         self.nodesPerRank = 8
         self.maxNodesPerRank = 10
@@ -25,6 +30,9 @@ class configuration():
         self.simTime = 1000
         self.timeSpeed = 100
         self.syncTime = 5
+        self.eventDriven = False
+        self.lookahead = 1
+        self.vectorTick = False
 
         # Main chain settings
         self.minerSlot = 16
@@ -32,6 +40,10 @@ class configuration():
         self.minerRatio = 90
         self.maxBroadcast = 8
         self.maxReceive = 32
+        self.seenCacheSize = 1024
+        self.chainBackend = "list"
+        self.forkChoice = "longest"
+        self.finalityDepth = 64
 
         # Beacon chain settings
         self.validatorRatio = 80
@@ -44,18 +56,70 @@ class configuration():
 
         # MPI settings
         self.maxOutQueue = 16
+        self.maxBacklog = 64
+        self.aggregateMsgs = False
+        self.placement = "id"
+        self.rebalanceInterval = 0
+        self.rebalanceThreshold = 0.1
+        self.maxMigrations = 8
+
+        # Link model settings
+        self.linkModel = False
+        self.linkLatency = (1, 4)
+        self.linkBandwidth = (1024, 16384)
+        self.blockSize = 8192
+        self.linkSeed = 0
+
+        # Checkpoint settings
+        self.checkpointInterval = 0
+        self.checkpointDir = "checkpoints"
+        self.restartFrom = ""
 
         # Post-processing setting
         self.verbosity = 1
+        self.traceLevel = 3
+        self.traceSize = 1 << 18
+        self.traceNodes = []
+        self.traceSample = 1.0
+        self.traceFile = True
+        self.metricsBuckets = 1000
+        self.delayBins = 128
+        self.delayBinWidth = 1
         self.shortReport = True
+        self.postProcesses = 1
+        self.nodeReports = True
+        self.netPlotNodes = 2000
+        self.resultsFile = True
+        self.resultsInterval = 100
         self.resultsDir = "data"
         now = datetime.datetime.now()
         simID = now.strftime("%Y-%m-%d_%H-%M-%S")
-        SID = [simID] * MPI.COMM_WORLD.Get_size()
-        simID = MPI.COMM_WORLD.scatter(SID, root=0)
+        SID = [simID] * comm.Get_size()
+        simID = comm.scatter(SID, root=0)
         self.simID = simID
+        for key, value in (overrides or {}).items():
+            if not hasattr(self, key):
+                print("WARNING : unknown setting "+str(key))
+            setattr(self, key, value)
         self.simDir = self.resultsDir+"/"+self.simID
 
     def verify(self):
         if self.nodesPerRank > self.maxNodesPerRank:
             print("WARNING : nodes per rank higher than max nodes per rank")
+        if self.eventDriven and self.lookahead < 1:
+            print("WARNING : lookahead must be at least one tick, using 1")
+            self.lookahead = 1
+        if self.eventDriven and self.vectorTick:
+            print("WARNING : vectorized ticks do not apply to the event driven engine")
+            self.vectorTick = False
+        if self.linkModel and self.linkLatency[0] < 1:
+            print("WARNING : link latency must be at least one tick, using 1")
+            self.linkLatency = (1, max(1, self.linkLatency[1]))
+        if self.linkModel and self.eventDriven:
+            self.lookahead = self.linkLatency[0]
+        if self.eventDriven and self.rebalanceInterval > 0:
+            print("WARNING : load balancing only applies to the tick engine")
+            self.rebalanceInterval = 0
+        if self.placement not in ("id", "partition"):
+            print("WARNING : unknown placement "+str(self.placement)+", using id")
+            self.placement = "id"
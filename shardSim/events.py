@@ -0,0 +1,45 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import heapq
+
+
+# Event kinds
+DELIVER = 0
+MINE = 1
+SLOT = 2
+
+
+##  This class is the priority queue of timestamped events used by the
+#   event-driven engine. Events with the same time are served in the order
+#   they were pushed.
+class eventQueue():
+
+    def __init__(self):
+        self.heap = []
+        self.count = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, time, node, kind, data=None):
+        heapq.heappush(self.heap, (time, self.count, node, kind, data))
+        self.count += 1
+
+    def pop(self):
+        time, _, node, kind, data = heapq.heappop(self.heap)
+        return time, node, kind, data
+
+    def nextTime(self):
+        if self.heap:
+            return self.heap[0][0]
+        return float("inf")
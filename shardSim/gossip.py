@@ -0,0 +1,37 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+##  This class remembers the IDs of the last gossiped messages seen by a
+#   node in two rotating sets. When the current set is full it replaces the
+#   previous one, so the cache holds between size and twice size IDs and
+#   forgets the oldest ones. A size of zero disables the cache.
+class seenCache():
+
+    def __init__(self, size):
+        self.size = size
+        self.current = set()
+        self.previous = set()
+
+    def __contains__(self, msgID):
+        return msgID in self.current or msgID in self.previous
+
+    ##  This method records an ID and returns False if it was already seen.
+    def mark(self, msgID):
+        if self.size <= 0:
+            return True
+        if msgID in self.current or msgID in self.previous:
+            return False
+        if len(self.current) >= self.size:
+            self.previous = self.current
+            self.current = set()
+        self.current.add(msgID)
+        return True
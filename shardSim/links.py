@@ -0,0 +1,60 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+from . import wire
+
+
+MASK64 = (1 << 64) - 1
+
+
+##  This function mixes a 64 bits integer into a well distributed one.
+def splitMix(x):
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+##  This class models the links between nodes. Every link has a latency and
+#   a bandwidth drawn from the configured ranges with a hash of its two
+#   ends, so all the ranks agree on them without communication. A message
+#   arrives after the latency of its link plus the time to transmit its
+#   size at the bandwidth of the link.
+class linkModel():
+
+    def __init__(self, config):
+        self.minLatency, self.maxLatency = config.linkLatency
+        self.minBandwidth, self.maxBandwidth = config.linkBandwidth
+        self.blockSize = config.blockSize
+        self.seed = config.linkSeed
+
+    ##  This method returns the latency, in ticks, and the bandwidth, in
+    #   bytes per tick, of the link between two nodes.
+    def link(self, a, b):
+        if a > b:
+            a, b = b, a
+        h = splitMix(splitMix(self.seed ^ a) ^ b)
+        latency = self.minLatency + (h & 0xFFFF) % (self.maxLatency - self.minLatency + 1)
+        bandwidth = self.minBandwidth + (h >> 16) % (self.maxBandwidth - self.minBandwidth + 1)
+        return latency, bandwidth
+
+    ##  This method returns the modeled size of a message in bytes.
+    def size(self, message):
+        if "block" in message:
+            return wire.size(message) + self.blockSize
+        return wire.size(message)
+
+    ##  This method returns the virtual time at which a message sent by its
+    #   source arrives at the target node.
+    def arrival(self, target, message):
+        latency, bandwidth = self.link(message["source"], target)
+        return message["time"] + latency + -(-self.size(message) // bandwidth)
@@ -0,0 +1,132 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import math
+import numpy as np
+
+
+##  This class estimates quantiles of a stream of non negative values with
+#   a bounded relative error. Values are counted in logarithmic buckets, so
+#   memory does not depend on the number of values, and sketches of
+#   different ranks can be merged by adding their counts.
+class quantileSketch():
+
+    ##  Constructor of the sketch.
+    #   @param  accuracy    Relative accuracy of the quantiles.
+    #   @param  nbBuckets   Number of buckets, larger values are clamped.
+    def __init__(self, accuracy=0.01, nbBuckets=2048):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.logGamma = math.log(self.gamma)
+        self.counts = np.zeros(nbBuckets, dtype=np.int64)
+        self.zeros = 0
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value <= 0:
+            self.zeros += 1
+            return
+        i = int(math.ceil(math.log(value) / self.logGamma))
+        self.counts[min(max(i, 0), len(self.counts) - 1)] += 1
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+
+    def mean(self):
+        return float(self.total) / max(self.count, 1)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0
+        i = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side="right"))
+        return 2 * self.gamma ** i / (self.gamma + 1)
+
+
+##  This class holds the metrics of all the nodes of a rank in preallocated
+#   arrays. Message counts are kept per time bucket and block delays and
+#   block times in histograms, so memory stays the same whatever the length
+#   of the simulation and updates are O(1).
+class rankMetrics():
+
+    def __init__(self, config, nbNodes):
+        self.width = max(1, int(math.ceil(float(config.simTime + 1) / config.metricsBuckets)))
+        self.nbBuckets = (config.simTime + 1) // self.width + 1
+        self.binWidth = max(1, config.delayBinWidth)
+        self.nbBins = config.delayBins
+        self.sent = np.zeros((nbNodes, self.nbBuckets), dtype=np.int32)
+        self.recv = np.zeros((nbNodes, self.nbBuckets), dtype=np.int32)
+        self.blockDelays = np.zeros((nbNodes, self.nbBins), dtype=np.int32)
+        self.blockTimes = np.zeros((nbNodes, self.nbBins), dtype=np.int32)
+        self.duplicates = np.zeros(nbNodes, dtype=np.int64)
+        self.dropped = np.zeros(nbNodes, dtype=np.int64)
+        self.queueDepth = np.zeros(self.nbBuckets, dtype=np.int64)
+        self.delaySketch = quantileSketch()
+        self.messageSketch = quantileSketch()
+        self.sendSketch = quantileSketch()
+
+    def bucket(self, time):
+        return min(time // self.width, self.nbBuckets - 1)
+
+    def bin(self, value):
+        return min(max(value, 0) // self.binWidth, self.nbBins - 1)
+
+    def messageSent(self, index, time):
+        self.sent[index, self.bucket(time)] += 1
+
+    def messageReceived(self, index, time, sendTime):
+        self.recv[index, self.bucket(time)] += 1
+        self.messageSketch.add(time - sendTime)
+
+    def duplicateDropped(self, index):
+        self.duplicates[index] += 1
+
+    def messageDropped(self, index):
+        self.dropped[index] += 1
+
+    ##  This method records the ticks between the send of a message and the
+    #   completion of its request.
+    def sendCompleted(self, latency):
+        self.sendSketch.add(latency)
+
+    ##  This method keeps the largest number of messages waiting to be sent
+    #   by the rank in each time bucket.
+    def queueSampled(self, time, depth):
+        b = self.bucket(time)
+        if depth > self.queueDepth[b]:
+            self.queueDepth[b] = depth
+
+    ##  This method records a main chain block received or mined by a node:
+    #   its propagation delay and the time since its parent was mined.
+    def blockArrived(self, index, delay, interval):
+        self.blockDelays[index, self.bin(delay)] += 1
+        self.blockTimes[index, self.bin(interval)] += 1
+        self.delaySketch.add(max(delay, 0))
+
+    ##  This method returns the start time of every bucket with activity and
+    #   the sent and received counts of a node in them.
+    def messages(self, index):
+        last = max(1, int(np.max(np.nonzero(self.sent[index] + self.recv[index])[0], initial=0)) + 1)
+        return np.arange(last) * self.width, self.sent[index, :last], self.recv[index, :last]
+
+    ##  This method returns the lower bound of each histogram bin up to the
+    #   last non empty one, and the counts of a histogram row.
+    def histogram(self, row):
+        last = max(1, int(np.max(np.nonzero(row)[0], initial=0)) + 1)
+        return np.arange(last) * self.binWidth, row[:last]
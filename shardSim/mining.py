@@ -0,0 +1,76 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import heapq, random
+import numpy as np
+
+
+##  This function returns the probability that a miner finds a block in a
+#   given tick, so that the whole network mines about one block every
+#   minerSlot ticks.
+def miningProbability(config, topo):
+    miningRange = int(topo.nbRanks * config.nodesPerRank * (config.minerRatio/100.0) * config.minerSlot)
+    return 1.0 / max(miningRange, 1)
+
+
+##  This class draws the mining times of all the miners of a rank. The next
+#   block time of each miner is sampled from a geometric distribution and
+#   kept in a min-heap, so only the miners that actually mine are visited.
+class miningSchedule():
+
+    def __init__(self, config, topo):
+        self.probability = miningProbability(config, topo)
+        self.rng = np.random.RandomState(random.getrandbits(32))
+        self.heap = []
+        self.miners = []
+
+    ##  This method draws the first block time of every miner at once.
+    def start(self, nodes, time):
+        self.miners = [n for n in nodes if n.miner]
+        gaps = self.rng.geometric(self.probability, size=len(self.miners))
+        self.heap = [(time + int(gap) - 1, i) for i, gap in enumerate(gaps)]
+        heapq.heapify(self.heap)
+
+    def nextTime(self):
+        if self.heap:
+            return self.heap[0][0]
+        return float("inf")
+
+    ##  This method returns the miners that mine a block at the given time
+    #   and draws their next block time in a single call.
+    def due(self, time):
+        fired = []
+        while self.heap and self.heap[0][0] <= time:
+            fired.append(heapq.heappop(self.heap)[1])
+        if fired:
+            gaps = self.rng.geometric(self.probability, size=len(fired))
+            for i, gap in zip(fired, gaps):
+                heapq.heappush(self.heap, (time + int(gap), i))
+        return [self.miners[i] for i in fired]
+
+    ##  This method removes a miner leaving the rank and returns its next
+    #   block time, or None if the node is not a miner of this rank.
+    def remove(self, node):
+        for k, (time, i) in enumerate(self.heap):
+            if self.miners[i] is node:
+                self.miners[i] = None
+                self.heap[k] = self.heap[-1]
+                self.heap.pop()
+                heapq.heapify(self.heap)
+                return time
+        return None
+
+    ##  This method adds a miner arriving on the rank with its next block
+    #   time.
+    def add(self, node, time):
+        self.miners.append(node)
+        heapq.heappush(self.heap, (time, len(self.miners) - 1))
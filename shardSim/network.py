@@ -10,10 +10,27 @@
 ## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
 
 
-import os
+import os, random, time
+from collections import deque
+import numpy as np
 
 
-from .plot import getFig, plotData, plotNetwork
+from .plot import getFig, plotNetwork, plotRankNetwork
+from .events import eventQueue, DELIVER, SLOT
+from .mining import miningSchedule
+from .schedule import epochSchedule
+from .channel import channel
+from .partition import placeNodes
+from .state import rankState
+from .trace import tracer
+from .metrics import rankMetrics
+from .post import postPipeline
+from .results import resultsStore
+from .links import linkModel
+from .wheel import timingWheel
+from .sends import sendQueue
+from . import timers
+from .wire import SHARD_HEADERS, CODES, messageID
 from .node import node
 
 
@@ -24,40 +41,348 @@ class network():
         self.topo = topo
         self.nodes = []
         self.nodeIDs = []
+        self.local = {}
+        self.time = 0
+        self.state = rankState(config.maxNodesPerRank)
+        self.tracer = tracer(config, topo)
+        self.metrics = rankMetrics(config, config.maxNodesPerRank)
+        self.location = np.arange(topo.nbRanks * config.maxNodesPerRank, dtype=np.int32) // config.maxNodesPerRank
+        self.measure = config.rebalanceInterval > 0
+        self.timers = timers.phaseTimers()
+        self.post = postPipeline(config, topo)
+        self.results = resultsStore(config, topo)
+        self.events = eventQueue()
+        self.links = linkModel(config) if config.linkModel else None
+        self.wheel = timingWheel()
+        self.sends = sendQueue(config, self)
+        self.mining = miningSchedule(config, topo)
+        self.epochs = epochSchedule(config, topo)
+        self.budget = {}
+        self.inbox = {}
+        self.world = channel(topo.comm, range(topo.nbRanks))
+        self.shardNet = None
+        self.channels = [self.world]
+        self.edgeCut = 0.0
+        self.phaseTables = None
+        if topo.nbShards > 0:
+            self.shardNet = channel(topo.shardComm, topo.shardRanks)
+            self.channels.append(self.shardNet)
+        for ch in self.channels:
+            ch.accept = self.accept
 
     def bootstrap(self):
+        peers = None
+        if self.config.placement == "partition":
+            peers = self.place()
         for i in range(self.config.nodesPerRank):
             nodeID = (self.topo.rank * self.config.maxNodesPerRank) + i
             n = node(self.config, self.topo, self, nodeID)
-            n.bootstrap()
+            self.local[nodeID] = n
+            self.inbox[nodeID] = deque()
+            n.bootstrap(peers[i] if peers != None else None)
             self.nodes.append(n)
             self.nodeIDs.append(nodeID)
+        self.mining.start(self.nodes, 0)
+        self.edgeCut = self.edgeCutRatio()
+
+    ##  This method builds the peer graph of the whole network on rank 0 and
+    #   partitions it, so that most peer links stay inside a rank. Each rank
+    #   receives the peer lists of the nodes it hosts.
+    def place(self):
+        plan = None
+        if self.topo.rank == 0:
+            plan, cut = placeNodes(self.config, self.topo.nbRanks, random.getrandbits(32))
+        return self.topo.comm.scatter(plan, root=0)
+
+    ##  This method returns the ratio of peer links that cross ranks.
+    def edgeCutRatio(self):
+        total = 0
+        remote = 0
+        for n in self.nodes:
+            total += len(n.peers)
+            remote += len([p for p in n.peers if p not in self.local])
+        total = self.topo.comm.allreduce(total)
+        remote = self.topo.comm.allreduce(remote)
+        return float(remote) / max(total, 1)
 
     def tick(self):
+        if self.config.vectorTick:
+            return self.tickVector()
+        if not self.config.aggregateMsgs:
+            self.dispatch()
+        if self.links != None:
+            self.release()
+        miners = self.mining.due(self.time)
+        cost = self.state.cost
+        for node in self.nodes:
+            if self.measure:
+                start = time.perf_counter()
+                node.tick(node in miners)
+                cost[node.index] += time.perf_counter() - start
+            else:
+                node.tick(node in miners)
+        if not self.config.aggregateMsgs:
+            self.sends.progress(self.time)
+        self.time += 1
+        if self.config.aggregateMsgs:
+            self.collect()
+
+    ##  Vectorized version of tick(). Time, slots and epochs of all the nodes
+    #   advance as array operations, and only the nodes with messages
+    #   waiting, a block to mine, a block to propose or a full send queue
+    #   run Python code.
+    def tickVector(self):
+        state = self.state
+        if not self.config.aggregateMsgs:
+            self.dispatch()
+        if self.links != None:
+            self.release()
+        for i in np.nonzero(state.pending)[0]:
+            self.timed(self.nodes[i], "listen")
+        for node in self.mining.due(self.time):
+            self.timed(node, "mineBlock")
+        if self.time > 0 and self.time % self.config.slotDuration == 0:
+            for i in state.advanceSlots(self.config.epochLength):
+                self.nodes[i].refreshCommittees()
+            self.proposeAll()
+        if not self.config.aggregateMsgs:
+            self.sends.progress(self.time)
+        state.time += 1
+        self.time += 1
+        if self.config.aggregateMsgs:
+            self.collect()
+
+    ##  This method finds the beacon and shard proposers of the current slot
+    #   among the nodes of this rank, using the committees shared by each
+    #   group of validators, and lets only them propose.
+    def proposeAll(self):
+        proposers = set()
+        for epoch, seed, group in self.state.committeeGroups():
+            first = self.nodes[group[0]]
+            committees, shards = self.epochs.entry(epoch, seed, first.validators)
+            slot = first.slot
+            members = set(self.nodeIDs[i] for i in group) if len(group) < len(self.nodes) else self.local
+            if committees and committees[slot % self.config.epochLength]:
+                proposer = committees[slot % self.config.epochLength][0]
+                if proposer in members:
+                    proposers.add(proposer)
+            if first.shard >= 0 and shards[first.shard]:
+                proposer = shards[first.shard][slot % len(shards[first.shard])]
+                if proposer in members:
+                    proposers.add(proposer)
+        for nodeID in sorted(proposers):
+            self.timed(self.local[nodeID], "propose")
+
+    ##  This method calls a method of a node and adds its duration to the
+    #   cost of the node when load balancing is enabled.
+    def timed(self, node, method):
+        if not self.measure:
+            return getattr(node, method)()
+        start = time.perf_counter()
+        getattr(node, method)()
+        self.state.cost[node.index] += time.perf_counter() - start
+
+    ##  This method sends the messages held back in the send backlogs and
+    #   receives every message still in flight towards this rank into the
+    #   inboxes, so that no message is on the wire. It is collective.
+    def quiesce(self):
+        self.sends.flush()
+        if not self.config.aggregateMsgs and not self.config.eventDriven:
+            for ch in self.channels:
+                for source, target, message in ch.drain():
+                    self.deliver(target, message, source)
+        self.sends.wait(self.time)
+
+    ##  This method appends a message to the inbox of a local node.
+    def enqueue(self, target, message, source):
+        self.inbox[target].append((message, source))
+        self.state.pending[self.local[target].index] += 1
+
+    ##  This method receives a message for a local node. With the link model
+    #   it waits in the timing wheel until its modeled arrival time,
+    #   otherwise it goes straight to the inbox.
+    def deliver(self, target, message, source):
+        if self.links != None:
+            self.wheel.add(self.links.arrival(target, message), (target, message, source))
+        else:
+            self.enqueue(target, message, source)
+
+    ##  This method moves the messages arriving at the current time from
+    #   the timing wheel to the inboxes.
+    def release(self):
+        start = time.perf_counter()
+        for target, message, source in self.wheel.advance(self.time):
+            if target in self.local:
+                self.enqueue(target, message, source)
+            else:
+                self.forward(target, message)
+        self.timers.add(timers.RELEASE, start)
+
+    ##  This method sends a message to the rank now hosting its target,
+    #   which migrated while the message was waiting on this rank.
+    def forward(self, target, message):
+        ch = self.channelFor(message)
+        if self.config.aggregateMsgs:
+            ch.post(int(self.location[target]), target, message)
+        else:
+            self.sends.forward(ch, int(self.location[target]), target, message, self.time)
+
+    ##  This method returns the time at which a message is delivered by the
+    #   event driven engine.
+    def arrival(self, target, message):
+        if self.links != None:
+            return self.links.arrival(target, message)
+        return message["time"] + self.config.lookahead
+
+    ##  This method swaps the aggregated buffers and fills the inboxes.
+    def collect(self):
+        start = time.perf_counter()
+        if self.links != None:
+            for source, target, message in self.alltoall():
+                self.deliver(target, message, source)
+        else:
+            targets = []
+            for source, target, message in self.alltoall():
+                self.inbox[target].append((message, source))
+                targets.append(self.local[target].index)
+            np.add.at(self.state.pending, targets, 1)
+        self.timers.add(timers.COLLECT, start)
+
+    ##  This method receives all the point to point messages waiting for
+    #   this rank, whatever their target node, into the inboxes. It is the
+    #   only place where a rank probes for messages in tick mode.
+    def dispatch(self):
+        start = time.perf_counter()
+        for ch in self.channels:
+            for source, target, message in ch.receiveAll():
+                self.deliver(target, message, source)
+        self.timers.add(timers.DISPATCH, start)
+
+    ##  This method counts a message arriving for a node of this rank, with
+    #   the bytes it took on the wire, and tells whether it must be decoded
+    #   for its target, that is if the target has not processed a copy of it
+    #   yet.
+    def accept(self, target, code, msgID, size):
+        self.timers.messageReceived(code, size)
+        if not msgID:
+            return True
+        n = self.local[target]
+        if msgID in n.seen:
+            self.metrics.duplicateDropped(n.index)
+            return False
+        return True
+
+    ##  This method delivers a message between two nodes of this rank without
+    #   serialization or MPI calls. The message is copied, as the wire
+    #   format would, and lands in the inbox of the target, or in a delivery
+    #   event when the simulation is event driven.
+    def deliverLocal(self, target, message):
+        if not self.accept(target, CODES[message["header"]], messageID(message), 0):
+            return
+        message = dict(message)
+        if "block" in message:
+            message["block"] = message["block"].copy()
+        if self.config.eventDriven:
+            self.events.push(self.arrival(target, message), self.local[target], DELIVER, (message, self.topo.rank))
+        else:
+            self.deliver(target, message, self.topo.rank)
+
+    ##  This method returns the channel that carries a message: shard
+    #   traffic stays inside the sub-communicator of the shard.
+    def channelFor(self, message):
+        if self.shardNet != None and message["header"] in SHARD_HEADERS:
+            return self.shardNet
+        return self.world
+
+    ##  This method swaps the buffers of every channel and returns the
+    #   messages received.
+    def alltoall(self):
+        received = []
+        for ch in self.channels:
+            received.extend(ch.alltoall())
+        return received
+
+    ##  This method pushes the first slot event of every validator. Mining
+    #   events come from the mining schedule of the rank.
+    def schedule(self):
         for node in self.nodes:
-            node.tick()
+            if node.val:
+                self.events.push(self.config.slotDuration, node, SLOT)
+
+    ##  This method processes all the local events strictly before horizon.
+    #   Messages sent here are delivered at least lookahead ticks later,
+    #   so no other rank can produce an event inside the current window.
+    def advance(self, horizon):
+        start = time.perf_counter()
+        while min(self.events.nextTime(), self.mining.nextTime()) < horizon:
+            if self.mining.nextTime() < self.events.nextTime():
+                now = self.mining.nextTime()
+                for node in self.mining.due(now):
+                    node.time = now
+                    node.mineBlock()
+                continue
+            now, node, kind, data = self.events.pop()
+            node.time = now
+            if kind == DELIVER:
+                last, count = self.budget.get(node.nodeID, (-1, 0))
+                if last != now:
+                    count = 0
+                if count >= self.config.maxReceive:
+                    self.events.push(now + 1, node, DELIVER, data)
+                    continue
+                self.budget[node.nodeID] = (now, count + 1)
+                node.receive(data[0], data[1])
+            elif kind == SLOT:
+                node.validate()
+                self.events.push(now + self.config.slotDuration, node, SLOT)
+        self.timers.add(timers.ADVANCE, start)
+        if not self.config.aggregateMsgs:
+            self.sends.progress(horizon)
+
+    ##  This method receives every message sent to this rank so far and
+    #   turns it into a delivery event.
+    def exchange(self):
+        start = time.perf_counter()
+        for ch in self.channels:
+            if self.config.aggregateMsgs:
+                received = ch.alltoall()
+            else:
+                received = ch.drain()
+            for source, target, message in received:
+                self.events.push(self.arrival(target, message), self.local[target], DELIVER, (message, source))
+        self.timers.add(timers.EXCHANGE, start)
 
     def logNet(self):
         for node in self.nodes:
             node.writePeers()
 
-    def plotP2P(self, globalPeers):
+    ##  This method gathers on rank 0 what the P2P figures need: the node
+    #   IDs, their number of peers and the matrix of links between ranks.
+    #   Edges are only gathered when the network is small enough to be
+    #   drawn node by node.
+    def gatherP2P(self):
+        nbNodes = self.topo.nbRanks * self.config.nodesPerRank
+        links = np.zeros(self.topo.nbRanks, dtype=np.int64)
+        edges = []
+        for n in self.nodes:
+            for peer in n.peers:
+                if peer != n.nodeID:
+                    links[self.location[peer]] += 1
+                    if nbNodes <= self.config.netPlotNodes:
+                        edges.append((n.nodeID, peer))
+        counts = [len([p for p in n.peers if p != n.nodeID]) for n in self.nodes]
+        return self.topo.comm.gather((self.nodeIDs, counts, links, edges), root=0)
+
+    def plotP2P(self, summary):
         nodes = []
         edges = []
         nodePeers = []
-        for rank in globalPeers:
-            for node in rank:
-                nodeID = int(node[0])
-                nodes.append(nodeID)
-                peers = node[1]
-                nbPeers = 0
-                for peer in peers:
-                    if nodeID == peer:
-                        log("WARNING : Self Loop Edge %d - %d" % (nodeID, peer), 1)
-                    else:
-                        edges.append(sorted([nodeID, peer]))
-                        nbPeers += 1
-                nodePeers.append(nbPeers)
+        links = []
+        for rankNodes, counts, rankLinks, rankEdges in summary:
+            nodes.extend(rankNodes)
+            nodePeers.extend(counts)
+            links.append(rankLinks)
+            edges.extend(rankEdges)
         nbNodes = self.topo.nbRanks * self.config.nodesPerRank
         dataset = []
         dataset.append(range(nbNodes))
@@ -76,6 +401,10 @@ class network():
         figConf["hline"]        = sum(nodePeers)/len(nodePeers)     # Horizontal line for average
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
-        plotNetwork(nodes, edges, nodePeers, self.config.simDir+"/net.png")
+        self.post.figure(figConf)
+        cacheDir = self.config.resultsDir+"/layouts"
+        if len(nodes) <= self.config.netPlotNodes:
+            self.post.submit(plotNetwork, nodes, edges, nodePeers, self.config.simDir+"/net.png", cacheDir)
+        else:
+            self.post.submit(plotRankNetwork, links, self.config.simDir+"/net.png", cacheDir)
 
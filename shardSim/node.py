@@ -11,19 +11,34 @@
 
 
 import random, sys
-from mpi4py import MPI
+from time import perf_counter
 
 
-from .report import nodeReport, nodeLogReport, nullReport
-from .plot import getFig, plotData
-from .block import block
-from .tools import getShuffle, splitCommittees
+from .report import nodePage, writeNodePages
+from .plot import getFig
+from .block import block, newHash
+from . import timers
+from .wire import CODES, messageID, size
+from .gossip import seenCache
+from .store import blockStore
+from .chain import newChain
+from .tree import blockTree, KNOWN, ORPHAN, UNCLE, EXTENDED, REORG
+from .state import field
+from . import trace
 
 
 ##  This class represents a node in the peer to peer network. It includes
 #   miners as well as validators; good or bad actors in the network.
 class node():
 
+    # Scalar state of the node, kept in the arrays of the rank state
+    time = field("time")
+    slot = field("slot")
+    epoch = field("epoch")
+    seed = field("seed")
+    miner = field("miner")
+    val = field("val")
+
     ##  This method listen for messages from other nodes
     #   @param  self    Pointer to this node.
     #   @param  config  Configuration for the current execution.
@@ -35,30 +50,42 @@ class node():
         self.topo = topo
         self.net = net
         self.nodeID = nodeID
+        self.tracer = net.tracer
+        self.traced = net.tracer.traces(nodeID)
+        self.state = net.state
+        self.metrics = net.metrics
+        self.timers = net.timers
+        self.index = nodeID - topo.rank * config.maxNodesPerRank
         self.address = '0x%040x' % random.getrandbits(40 * 4)
         se = [int(s) for s in self.config.simID.split("_")[1].split("-")]
         self.seed = sum(se)%100
         self.time = 0
         self.slot = 0
         self.epoch = 0
-        self.logs = []
         self.nodes = []
         self.peers = []
-        self.uncles = []
-        self.msgSent = []
-        self.msgRecv = []
-        self.outQueue = []
-        self.lostMsgs = []
-        self.proposers = []
-        self.blockChain = []
+        self.uncles = blockStore()
+        self.seen = seenCache(config.seenCacheSize)
+        self.proposer = -1
+        self.blockChain = newChain(config)
         self.beaconChain = []
+        self.beaconStore = blockStore()
+        self.shard = topo.shard
+        self.shardPeers = []
+        self.shardChain = []
+        self.shardStore = blockStore()
+        self.shardCommittee = ()
+        self.crosslinks = {}
+        self.pendingCrosslinks = {}
         self.validators = []
         self.beaconPending = {}
         self.epochCommittees = []
         self.currentCommittee = []
-        self.blockArrival = []
         b = block(None, 0, 0)
         self.blockChain.append(b)
+        self.tree = blockTree(self.blockChain, self.uncles, self.config.forkChoice, self.config.finalityDepth)
+        if self.shard >= 0:
+            self.appendShard(block(None, 0, 0))
         self.ether = random.randint(0, 100)
         self.val = False
         if random.randint(0, 100) < self.config.minerRatio:
@@ -66,15 +93,20 @@ class node():
         else:
             self.miner = False
 
+    ##  This method records a trace event of the node. Arguments are integers
+    #   and nothing is formatted unless the event level is enabled.
+    def trace(self, event, *args):
+        if self.tracer.active[event]:
+            self.tracer.record(event, self.nodeID, self.time, args, self.traced)
+
+    ##  This method prints a free form message on the console, used outside
+    #   of the simulation itself.
     def log(self, msg, verbosity, nodeID=-1):
         if nodeID == -1:
             if verbosity <= self.config.verbosity:
                 idmsg = "[%05d] : " % self.nodeID
                 print(idmsg + msg)
                 sys.stdout.flush()
-            if verbosity <= self.config.verbosity + 2:
-                timsg = "[%05d] : " % self.time
-                self.logs.append(timsg + msg)
         else:
             if self.nodeID == nodeID:
                 idmsg = "[%05d] : " % self.nodeID
@@ -82,8 +114,13 @@ class node():
                 print(idmsg + timsg + msg)
                 sys.stdout.flush()
 
-    def bootstrap(self):
-        for i in range(self.config.nbPeers):
+    ##  This method connects the node to the network. Peers given by the
+    #   placement stage are already symmetric, otherwise the node asks
+    #   random nodes to become its peers.
+    def bootstrap(self, peers=None):
+        if peers != None:
+            self.peers = list(peers)
+        for i in range(self.config.nbPeers if peers == None else 0):
             message = {}
             message["header"] = "New peer"
             message["source"] = self.nodeID
@@ -93,152 +130,235 @@ class node():
                 target = target + random.randint(0, self.config.nodesPerRank-1)
             self.send(target, message)
             self.peers.append(target) # This assumes the petition will be received AND accepted
+        if self.shard >= 0:
+            self.bootstrapShard()
         self.listen()
-        self.cleanOutQueue()
-        self.log("List of peers created.", 2)
+        self.trace(trace.PEERS_CREATED)
         for r in range(self.topo.nbRanks):
             for n in range(self.config.nodesPerRank):
                 self.nodes.append((r * self.config.maxNodesPerRank) + n)
                 if (self.seed % self.config.nodesPerRank) != n:
                     self.validators.append((r * self.config.maxNodesPerRank) + n)
                     self.val = 1
-        self.log("Node bootstrap executed.", 2)
+        self.trace(trace.BOOTSTRAPPED)
+
+    ##  This method connects the node to peers hosted by the ranks of its
+    #   own shard, over which shard blocks are gossiped.
+    def bootstrapShard(self):
+        nbShardNodes = len(self.topo.shardRanks) * self.config.nodesPerRank
+        for i in range(min(self.config.nbPeers, nbShardNodes - 1)):
+            message = {}
+            message["header"] = "New shard peer"
+            message["source"] = self.nodeID
+            target = self.nodeID
+            while target == self.nodeID or target in self.shardPeers:
+                target = random.choice(self.topo.shardRanks) * self.config.maxNodesPerRank
+                target = target + random.randint(0, self.config.nodesPerRank-1)
+            self.send(target, message)
+            self.shardPeers.append(target)
 
     def validate(self):
+        start = perf_counter()
         if (self.time > 0) and (self.time % self.config.slotDuration == 0):
             self.slot = self.slot + 1
             if self.slot % self.config.epochLength == 0:
                 self.epoch = self.epoch + 1
                 if self.epoch > 0:
-                    if len(self.validators) < self.config.epochLength:
-                        self.log("WARNING : Not enough validators", 1)
-                    vl = getShuffle(self.validators, self.seed)
-                    self.epochCommittees = splitCommittees(vl, self.config.epochLength)
-                    self.seed = (self.seed * self.epoch) % 100
-                    #if self.nodeID == 0:
-                        #print(self.epochCommittees)
-                        #print(self.seed)
-                        #print(str(self.time) + " - " + str(self.slot) + " - " + str(self.epoch) )
-            if self.epoch > 0:
-                self.currentCommittee = self.epochCommittees[self.slot%self.config.epochLength]
-                self.proposers.append(self.currentCommittee[0])
-                #print(self.proposers[-1])
-                if self.proposers[-1] == self.nodeID:
-                    if len(self.beaconChain) > 0:
-                        b = block(self.beaconChain[-1], self.nodeID, self.time)
-                        bp = self.beaconChain[-1]
-                        self.log("Beacon : %d" % bp.number, 2)
-                        self.log("Beacon : %s" % bp.hash, 2)
-                        self.log("Beacon : %s" % bp.parent, 2)
-                        self.log("Beacon : %d" % bp.time, 2)
-                    else:
-                        b = block(None, 0, 0)
-                        b.miner = self.nodeID
-                        b.time = self.time
-                    b.arrivalTime = self.time
-                    self.beaconChain.append(b)
-                    self.log("I have mined beacon block %s number %d at time %d" % (b.hash[-4:], b.number, self.time), 1)
-                    #print(self.currentCommittee)
-                    message = {}
-                    message["header"] = "New beacon block"
-                    message["source"] = self.nodeID
-                    message["block"] = b
-                    self.broadcast(message)
-                else: # Adding beacon block place holder
-                    if len(self.beaconChain) > 0:
-                        b = block(self.beaconChain[-1], -1, -1)
-                    else:
-                        b = block(None, -1, -1)
-                        b.miner = -1
-                    #self.beaconChain.append(b)
-                    #self.log("Appending place holder", 2)
+                    self.refreshCommittees()
+            self.propose()
+        self.timers.add(timers.VALIDATE, start)
+
+    ##  This method draws the committees of the new epoch.
+    def refreshCommittees(self):
+        if len(self.validators) < self.config.epochLength:
+            self.trace(trace.FEW_VALIDATORS)
+        self.epochCommittees = self.net.epochs.committees(self.epoch, self.seed, self.validators)
+        if self.shard >= 0:
+            self.shardCommittee = self.net.epochs.shardCommittees(self.epoch, self.seed, self.validators)[self.shard]
+        self.state.committeeSeed[self.index] = self.seed
+        self.seed = (self.seed * self.epoch) % 100
+        #if self.nodeID == 0:
+            #print(self.epochCommittees)
+            #print(self.seed)
+            #print(str(self.time) + " - " + str(self.slot) + " - " + str(self.epoch) )
+
+    ##  This method does the work of the node in the current slot: proposing
+    #   a beacon block and a shard block when it is its turn.
+    def propose(self):
+        start = perf_counter()
+        if self.epoch > 0 and self.epochCommittees:
+            self.currentCommittee = self.epochCommittees[self.slot%self.config.epochLength]
+            self.proposer = self.currentCommittee[0] if self.currentCommittee else -1
+            if self.proposer == self.nodeID:
+                if len(self.beaconChain) > 0:
+                    b = block(self.beaconChain[-1], self.nodeID, self.time)
+                    bp = self.beaconChain[-1]
+                    self.trace(trace.BEACON_PARENT, bp.hash, bp.number, bp.time)
+                else:
+                    b = block(None, 0, 0)
+                    b.miner = self.nodeID
+                    b.time = self.time
+                b.arrivalTime = self.time
+                b.crosslinks = tuple(self.pendingCrosslinks[s] for s in sorted(self.pendingCrosslinks))
+                self.appendBeacon(b)
+                self.trace(trace.MINED_BEACON, b.hash, b.number, self.time)
+                #print(self.currentCommittee)
+                message = {}
+                message["header"] = "New beacon block"
+                message["source"] = self.nodeID
+                message["block"] = b
+                self.broadcast(message)
+            else: # Adding beacon block place holder
+                if len(self.beaconChain) > 0:
+                    b = block(self.beaconChain[-1], -1, -1)
+                else:
+                    b = block(None, -1, -1)
+                    b.miner = -1
+                #self.beaconChain.append(b)
+                #self.log("Appending place holder", 2)
+        if self.epoch > 0 and self.shardCommittee:
+            if self.shardCommittee[self.slot % len(self.shardCommittee)] == self.nodeID:
+                self.proposeShardBlock()
+        self.timers.add(timers.PROPOSE, start)
+
+    ##  This method creates a block on the chain of the node's shard and
+    #   gossips it inside the shard. On the last slot of an epoch, the shard
+    #   tip is also sent as a crosslink to the beacon proposers of the next
+    #   epoch, which include it in the next beacon block they propose.
+    def proposeShardBlock(self):
+        b = block(self.shardChain[-1], self.nodeID, self.time)
+        b.arrivalTime = self.time
+        self.appendShard(b)
+        self.trace(trace.MINED_SHARD, self.shard, b.hash, b.number, self.time)
+        message = {}
+        message["header"] = "New shard block"
+        message["source"] = self.nodeID
+        message["shard"] = self.shard
+        message["block"] = b
+        self.broadcast(message, self.shardPeers)
+        if self.slot % self.config.epochLength == self.config.epochLength - 1:
+            committees = self.net.epochs.committees(self.epoch + 1, self.seed, self.validators)
+            for proposer in sorted(set(c[0] for c in committees if c)):
+                message = {}
+                message["header"] = "New crosslink"
+                message["source"] = self.nodeID
+                message["shard"] = self.shard
+                message["block"] = b
+                self.send(proposer, message)
 
-    def tick(self):
+    def tick(self, mine=False):
         self.listen()
-        if self.miner:
-            self.mine()
+        if mine:
+            self.mineBlock()
         if self.val:
             self.validate()
-        self.cleanOutQueue()
         self.time += 1
 
-    def cleanOutQueue(self):
-        #self.log("Out queue length: "+str(len(self.outQueue)), 5, 34)
-        cnt = self.config.maxOutQueue
-        while (len(self.outQueue) > self.config.maxOutQueue) and (cnt > 0):
-            sReq = self.outQueue.pop(0)
-            if sReq.test()[0] != True:
-                self.lostMsgs.append(sReq)
-                cnt = cnt - 1
-        if (cnt <= 0):
-            self.log("TOO MANY FAILED MESSAGES!!! Out queue length: "+str(len(self.outQueue)), 1)
-            self.log("TOO MANY FAILED MESSAGES!!! Out queue length: "+str(len(self.lostMsgs)), 1)
-        #self.log("Out queue length: "+str(len(self.outQueue)), 5, 34)
-
     def send(self, target, message):
-        targetRank = int(target/self.config.maxNodesPerRank)
-        self.log("Message sent to node %d in rank %d" % (target, targetRank), 3)
-        sReq = self.topo.comm.isend(message, dest=targetRank, tag=target)
-        self.outQueue.append(sReq)
-        while self.time >= len(self.msgSent):
-            self.msgSent.append(0)
-        self.msgSent[self.time] = self.msgSent[self.time] + 1
-
-    def broadcast(self, message):
+        start = perf_counter()
+        targetRank = int(self.net.location[target])
+        self.trace(trace.MSG_SENT, target, targetRank)
+        message["time"] = self.time
+        if target in self.net.local:
+            self.net.deliverLocal(target, message)
+            self.timers.messageSent(CODES[message["header"]], 0)
+        else:
+            if self.config.aggregateMsgs:
+                self.net.channelFor(message).post(targetRank, target, message)
+            else:
+                self.net.sends.send(self, self.net.channelFor(message), targetRank, target, message)
+            self.timers.messageSent(CODES[message["header"]], size(message))
+        self.metrics.messageSent(self.index, self.time)
+        self.timers.add(timers.SEND, start)
+
+    def broadcast(self, message, peers=None):
+        start = perf_counter()
+        if peers == None:
+            peers = self.peers
         nbMessages = self.config.maxBroadcast
-        if nbMessages > len(self.peers):
-            nbMessages = len(self.peers)
-        bcList = random.sample(self.peers, nbMessages)
+        if nbMessages > len(peers):
+            nbMessages = len(peers)
+        bcList = random.sample(peers, nbMessages)
+        self.seen.mark(messageID(message))
         for peer in bcList:
             self.send(peer, message)
+        self.timers.add(timers.BROADCAST, start)
 
+    ##  This method receives up to maxReceive messages from the inbox of
+    #   the node, filled by the network of the rank.
     def listen(self):
-        status = MPI.Status()
+        start = perf_counter()
+        inbox = self.net.inbox[self.nodeID]
         listening = self.config.maxReceive
-        while listening > 0:
+        while listening > 0 and inbox:
             listening = listening - 1
-            flag = self.topo.comm.iprobe(source=MPI.ANY_SOURCE, tag=self.nodeID, status=status)
-            if flag:
-                source = status.Get_source()
-                message = self.topo.comm.recv(source=source, tag=self.nodeID)
-                self.log("Message %s received from %d" % (str(message), source), 3)
-                self.classifyMessage(message)
-                while self.time >= len(self.msgRecv):
-                    self.msgRecv.append(0)
-                self.msgRecv[self.time] = self.msgRecv[self.time] + 1
-
-
-    def checkChain(self):
-        last = len(self.blockChain) - 1
-        while last > 0:
-            if (self.blockChain[last].parent != self.blockChain[last-1].hash):
-                self.log("Chain needs to be reorganized", 2)
-                found = False
-                for index, uncle in enumerate(self.uncles):
-                    if uncle.hash == self.blockChain[last].parent:
-                        tempBlock = self.blockChain[last-1] #Swap them
-                        self.blockChain[last-1] = uncle
-                        self.uncles[index] = tempBlock
-                        found = True
-                if found:
-                    self.log("Blockchain reorganized with block %s" % (self.blockChain[last-1].hash[-4:]), 2)
-                else:
-                    self.log("WARNING : Blockchain could not be reorganized for block number %d" % self.blockChain[last].number, 1)
-                    # TODO: When this happens the node should ask for the blocks to a peer
-                    message = {}
-                    message["header"] = "Need main block"
-                    message["source"] = self.nodeID
-                    message["number"] = self.blockChain[last].number
-                    self.send(self.peers[random.randint(0,(len(self.peers)-1))], message)
-
-            last = last - 1
+            message, source = inbox.popleft()
+            self.receive(message, source)
+        self.state.pending[self.index] = len(inbox)
+        self.timers.add(timers.LISTEN, start)
+
+    ##  This method processes a message, unless it is a copy of a gossiped
+    #   message already seen by the node.
+    def receive(self, message, source):
+        msgID = messageID(message)
+        if msgID and not self.seen.mark(msgID):
+            self.metrics.duplicateDropped(self.index)
+            return
+        self.trace(trace.MSG_RECEIVED, CODES[message["header"]], message["source"], source)
+        self.metrics.messageReceived(self.index, self.time, message["time"])
+        start = perf_counter()
+        self.classifyMessage(message)
+        self.timers.classified(CODES[message["header"]], start)
+
+
+    def appendBeacon(self, b):
+        self.beaconChain.append(b)
+        self.beaconStore.add(b)
+        self.addCrosslinks(b)
+
+    ##  This method records the crosslinks carried by a beacon block and
+    #   forgets the pending ones it already includes.
+    def addCrosslinks(self, b):
+        for shard, number, h in b.crosslinks:
+            if shard not in self.crosslinks or number > self.crosslinks[shard][0]:
+                self.crosslinks[shard] = (number, h, b.number)
+                self.trace(trace.LINKED_CROSSLINK, shard, number)
+            if shard in self.pendingCrosslinks and self.pendingCrosslinks[shard][1] <= number:
+                del self.pendingCrosslinks[shard]
+
+    def appendShard(self, b):
+        self.shardChain.append(b)
+        self.shardStore.add(b)
+
+    ##  This method adds a main chain block to the block tree and logs the
+    #   effect it had on the best chain. The parent of an orphan block is
+    #   requested to a random peer.
+    def addBlock(self, b):
+        status = self.tree.add(b)
+        if status != ORPHAN and status != KNOWN:
+            self.metrics.blockArrived(self.index, b.arrivalTime - b.time, b.time - self.tree.get(b.parent).time)
+            self.net.results.blockArrived(self, b, status)
+        if status == EXTENDED:
+            self.trace(trace.NEW_BLOCK, b.hash, b.number)
+        elif status == REORG:
+            self.trace(trace.REORGANIZED, self.blockChain[-1].hash)
+        elif status == UNCLE:
+            self.trace(trace.UNCLE_BLOCK, b.hash, b.number, self.time)
+        elif status == ORPHAN:
+            self.trace(trace.UNKNOWN_PARENT, b.number)
+            message = {}
+            message["header"] = "Need main block"
+            message["source"] = self.nodeID
+            message["number"] = b.number - 1
+            self.send(self.peers[random.randint(0,(len(self.peers)-1))], message)
+        return status
 
     def classifyMessage(self, message):
         if message["header"] == "New peer":
             source = message["source"]
             if source not in self.peers:
                 self.peers.append(source)
-                self.log("Adding %d as peer" % source, 3)
+                self.trace(trace.NEW_PEER, source)
                 message = {}
                 message["header"] = "New peer"
                 message["source"] = self.nodeID
@@ -247,9 +367,9 @@ class node():
         if message["header"] == "Need main block":
             source = message["source"]
             number = message["number"]
-            self.log("Block %d was requested by peer %d" % (number, source), 1)
+            self.trace(trace.BLOCK_REQUESTED, number, source)
             index = number - self.blockChain[0].number
-            if len(self.blockChain) > index:
+            if 0 <= index < len(self.blockChain):
                 message = {}
                 message["header"] = "New main block"
                 message["source"] = self.nodeID
@@ -258,56 +378,30 @@ class node():
         elif message["header"] == "New main block":
             source = message["source"]
             newBlock = message["block"]
-            if next((b for b in self.blockChain if b.hash == newBlock.hash), None) != None:
-                self.log("Block %s already in the chain" % newBlock.hash[-4:], 3)
-            else: # If new block not in the blockchain
-                if newBlock.number ==  (self.blockChain[-1].number + 1): # If it is the next block
-                    newBlock.arrivalTime = self.time
-                    self.blockChain.append(newBlock) # Add it to the main chain
-                    self.log("New main block %s number %d received" % (newBlock.hash[-4:], newBlock.number), 2)
-                    message["source"] = self.nodeID
-                    self.broadcast(message)
-                    self.checkChain()
-                else:
-                    if newBlock.number <= self.blockChain[-1].number: # If it is the same height
-                        if next((b for b in self.uncles if b.hash == newBlock.hash), None) == None: # and not in uncles
-                            self.uncles.append(newBlock)
-                            self.log("Uncle block %s number %d received at time %d" % (newBlock.hash[-4:], newBlock.number, self.time), 2)
-                            self.broadcast(message)
-                        else:
-                            self.log("Block %s already in the uncles list" % newBlock.hash[-4:], 3)
-                    else: # If the block is ahead of the next block
-                        nbMissingBlocks = newBlock.number - self.blockChain[-1].number
-                        self.log("WARNING : Node seems out of sync", 1)
-                        for i in range(nbMissingBlocks-1):
-                            b = block(None, 0, 0)
-                            b.arrivalTime = self.time
-                            b.time = self.time
-                            b.number = self.blockChain[-1].number + 1
-                            self.blockChain.append(b)
-                        newBlock.arrivalTime = self.time
-                        self.blockChain.append(newBlock) # Add it to the main chain
-                        self.log("New block %s number %d received" % (newBlock.hash[-4:], newBlock.number), 3)
-                        message["source"] = self.nodeID
-                        self.broadcast(message)
-                        self.checkChain()
+            if self.tree.known(newBlock.hash):
+                self.trace(trace.KNOWN_BLOCK, newBlock.hash)
+            else: # If new block not in the block tree
+                newBlock.arrivalTime = self.time
+                self.addBlock(newBlock)
+                message["source"] = self.nodeID
+                self.broadcast(message)
         elif message["header"] == "New beacon block":
             source = message["source"]
             newBlock = message["block"]
-            if next((b for b in self.beaconChain if b.hash == newBlock.hash), None) != None:
-                self.log("Block %s already in the beacon chain" % newBlock.hash[-4:], 3)
+            if newBlock.hash in self.beaconStore:
+                self.trace(trace.KNOWN_BEACON, newBlock.hash)
             else: # If new block not in the beacon chain
                 if len(self.beaconChain) == 0:
                     newBlock.arrivalTime = self.time
-                    self.beaconChain.append(newBlock) # Add it to the main chain
-                    self.log("New beacon block %s number %d received" % (newBlock.hash[-4:], newBlock.number), 3)
+                    self.appendBeacon(newBlock) # Add it to the main chain
+                    self.trace(trace.NEW_BEACON, newBlock.hash, newBlock.number)
                     message["source"] = self.nodeID
                     self.broadcast(message)
                 else:
                     if newBlock.number ==  (self.beaconChain[-1].number + 1): # If it is the next block
                         newBlock.arrivalTime = self.time
-                        self.beaconChain.append(newBlock) # Add it to the beacon chain
-                        self.log("New beacon block %s number %d received" % (newBlock.hash[-4:], newBlock.number), 3)
+                        self.appendBeacon(newBlock) # Add it to the beacon chain
+                        self.trace(trace.NEW_BEACON, newBlock.hash, newBlock.number)
                         message["source"] = self.nodeID
                         self.broadcast(message)
                     else:
@@ -315,76 +409,94 @@ class node():
                             newBlock.arrivalTime = self.time
                             index = newBlock.number - self.beaconChain[0].number
                             if newBlock.miner > self.beaconChain[index].miner: #FIXME : Not the right fork choice rule
+                                self.beaconStore.remove(self.beaconChain[index])
                                 self.beaconChain[index].number = newBlock.number
                                 self.beaconChain[index].miner = newBlock.miner
                                 self.beaconChain[index].hash = newBlock.hash
                                 self.beaconChain[index].time = newBlock.time
-                                self.log("New beacon block %s number %d overwriting past block (or placeholder)" % (newBlock.hash[-4:], newBlock.number), 3)
+                                self.beaconChain[index].crosslinks = newBlock.crosslinks
+                                self.beaconStore.add(self.beaconChain[index])
+                                self.addCrosslinks(self.beaconChain[index])
+                                self.trace(trace.BEACON_OVERWRITE, newBlock.hash, newBlock.number)
                                 message["source"] = self.nodeID
                                 self.broadcast(message)
                                 bp = self.beaconChain[-1]
-                                self.log("Beacon : %d" % bp.number, 2)
-                                self.log("Beacon : %s" % bp.hash, 2)
-                                self.log("Beacon : %s" % bp.parent, 2)
-                                self.log("Beacon : %d" % bp.time, 2)
+                                self.trace(trace.BEACON_PARENT, bp.hash, bp.number, bp.time)
                             else:
-                                self.log("WARNING : Uncle beacon block received", 1)
+                                self.trace(trace.UNCLE_BEACON)
                         else: # If the block is ahead of the next block
                             nbMissingBlocks = newBlock.number - self.beaconChain[-1].number
-                            self.log("WARNING : Beacon chain seems out of sync", 2)
+                            self.trace(trace.BEACON_SYNC)
                             for i in range(nbMissingBlocks-1):
                                 b = block(None, 0, 0)
+                                b.hash = newHash()
                                 b.arrivalTime = self.time
                                 b.time = self.time
                                 b.number = self.blockChain[-1].number + 1
-                                self.beaconChain.append(b)
+                                self.appendBeacon(b)
                             newBlock.arrivalTime = self.time
-                            self.beaconChain.append(newBlock) # Add it to the beacon chain
+                            self.appendBeacon(newBlock) # Add it to the beacon chain
                             self.beaconPending[str(newBlock.number)] = 0
-                            self.log("New beacon block %s number %d received" % (newBlock.hash[-4:], newBlock.number), 3)
+                            self.trace(trace.NEW_BEACON, newBlock.hash, newBlock.number)
                             message["source"] = self.nodeID
                             self.broadcast(message)
                             #self.checkChain()
 
+        elif message["header"] == "New shard peer":
+            source = message["source"]
+            if source not in self.shardPeers:
+                self.shardPeers.append(source)
+                self.trace(trace.NEW_SHARD_PEER, source)
+                message = {}
+                message["header"] = "New shard peer"
+                message["source"] = self.nodeID
+                self.send(source, message)
+        elif message["header"] == "New shard block":
+            newBlock = message["block"]
+            if message["shard"] != self.shard or newBlock.hash in self.shardStore:
+                self.trace(trace.KNOWN_SHARD, newBlock.hash)
+            elif newBlock.number > self.shardChain[-1].number:
+                newBlock.arrivalTime = self.time
+                self.appendShard(newBlock)
+                self.trace(trace.NEW_SHARD_BLOCK, newBlock.hash, newBlock.number)
+                message["source"] = self.nodeID
+                self.broadcast(message, self.shardPeers)
+            else:
+                self.trace(trace.STALE_SHARD, newBlock.number)
+        elif message["header"] == "New crosslink":
+            shard = message["shard"]
+            newBlock = message["block"]
+            linked = shard in self.crosslinks and newBlock.number <= self.crosslinks[shard][0]
+            pending = shard in self.pendingCrosslinks and newBlock.number <= self.pendingCrosslinks[shard][1]
+            if not linked and not pending:
+                self.pendingCrosslinks[shard] = (shard, newBlock.number, newBlock.hash)
+                self.trace(trace.NEW_CROSSLINK, shard, newBlock.number)
         elif message["header"] == "New validator":
             source = message["source"]
             if source not in self.validators:
                 self.validators.append(source)
                 self.validators.sort()
-                self.log("Adding %d as validator" % source, 3)
+                self.trace(trace.NEW_VALIDATOR, source)
                 self.broadcast(message)
 
 
-    def mine(self):
-        r = random.randint(0, int((self.topo.nbRanks * self.config.nodesPerRank * (self.config.minerRatio/100.0) * self.config.minerSlot) - 1))
-        if (r == 0):
-            b = block(self.blockChain[-1], self.nodeID, self.time)
-            b.arrivalTime = self.time
-            self.blockChain.append(b)
-            self.log("I have mined block %s number %d at time %d" % (b.hash[-4:], b.number, self.time), 1)
-            message = {}
-            message["header"] = "New main block"
-            message["source"] = self.nodeID
-            message["block"] = b
-            self.broadcast(message)
-        else:
-            self.log("Random number was %d" % r, 4)
-
+    def mineBlock(self):
+        start = perf_counter()
+        b = block(self.blockChain[-1], self.nodeID, self.time)
+        b.arrivalTime = self.time
+        self.addBlock(b)
+        self.trace(trace.MINED_BLOCK, b.hash, b.number, self.time)
+        message = {}
+        message["header"] = "New main block"
+        message["source"] = self.nodeID
+        message["block"] = b
+        self.broadcast(message)
+        self.timers.add(timers.MINE, start)
+
+    ##  This method submits the pages of the node to the post-processing
+    #   pipeline of the rank.
     def report(self, short=False):
-        if (short):
-            htmlContent = nullReport(self)
-            htmlLogContent = nullReport(self)
-        else:
-            htmlContent = nodeReport(self)
-            htmlLogContent = nodeLogReport(self)
-        fileName = self.config.simDir+"/"+str(self.nodeID)+".html"
-        f =  open(fileName, "w")
-        f.write(htmlContent)
-        f.close()
-        fileName = self.config.simDir+"/"+str(self.nodeID)+"-log.html"
-        f =  open(fileName, "w")
-        f.write(htmlLogContent)
-        f.close()
+        self.net.post.submit(writeNodePages, nodePage(self, short))
 
 
     def plotBeaconMiners(self):
@@ -414,7 +526,7 @@ class node():
         figConf["legCol"]       = 1                                 # Columns in the legend
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
 
 
@@ -446,72 +558,54 @@ class node():
         figConf["legCol"]       = 1                                 # Columns in the legend
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
 
     def plotBlockTimes(self):
-        bt = []
-        blockTimes = []
-        lastBlockTime = self.blockChain[0].time
-        for block in self.blockChain[1:]:
-            if block.time >= lastBlockTime:
-                blockTimes.append(block.time - lastBlockTime)
-            else:
-                blockTimes.append(0)
-            lastBlockTime = block.time
+        bins, counts = self.metrics.histogram(self.metrics.blockTimes[self.index])
         dataset = []
-        dataset.append(range(len(blockTimes)))
-        dataset.append(blockTimes)
-        maxTime = max(blockTimes) + 1
+        dataset.append(bins.tolist())
+        dataset.append(counts.tolist())
+        maxCount = counts.max() + 1
         target = self.config.simDir+"/blockTimes.png"
         figConf = getFig("sbar")
         figConf["fileName"]     = target                            # Figure file name
         figConf["figSize"]      = (9,3)                             # Figure size in inches
-        figConf["xLabel"]       = "Block number"                    # Label of x axis
-        figConf["yLabel"]       = "Time to Block (s)"               # Label of y axis
-        figConf["axis"]         = [0, len(blockTimes), 0, maxTime]  # Axis limits
+        figConf["xLabel"]       = "Time to Block (s)"               # Label of x axis
+        figConf["yLabel"]       = "Number of blocks"                # Label of y axis
+        figConf["axis"]         = [0, bins[-1] + self.metrics.binWidth, 0, maxCount] # Axis limits
         figConf["yGrid"]        = True                              # Enable x axis grid lines
         figConf["colors"]       = ["b", "c", "c", "g", "y", "r" ]   # Colors
         figConf["labels"]       = ["BlockTime", "4", "5", "6"]      # Labels
-        figConf["hline"]        = sum(blockTimes)/len(blockTimes)   # Horizontal line for average
         figConf["legCol"]       = 1                                 # Columns in the legend
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
     def plotBlockDelays(self):
-        bt = []
-        delays = []
         if len(self.blockChain) < 1:
             self.log("WARNING: No blocks in this chain", 1)
-        for block in self.blockChain[1:]:
-            if block.arrivalTime >= block.time:
-                delays.append(block.arrivalTime - block.time)
-            else:
-                delays.append(0)
-        if len(delays) < 1 and len(self.blockChain) > 0:
+        bins, counts = self.metrics.histogram(self.metrics.blockDelays[self.index])
+        if counts.sum() < 1 and len(self.blockChain) > 0:
             self.log("WARNING: Block delays list is empty but not the blockChain", 1)
-            #print(len(self.blockChain))
-            #print(delays)
         dataset = []
-        dataset.append(range(len(delays)))
-        dataset.append(delays)
-        maxTime = max(delays) + 1
+        dataset.append(bins.tolist())
+        dataset.append(counts.tolist())
+        maxCount = counts.max() + 1
         target = self.config.simDir+"/"+str(self.nodeID)+"-blockDelays.png"
         figConf = getFig("sbar")
         figConf["fileName"]     = target                            # Figure file name
         figConf["figSize"]      = (9,3)                             # Figure size in inches
-        figConf["xLabel"]       = "Block number"                    # Label of x axis
-        figConf["yLabel"]       = "Block Delay(s)"                  # Label of y axis
-        figConf["axis"]         = [0, len(delays), 0, maxTime]      # Axis limits
+        figConf["xLabel"]       = "Block Delay(s)"                  # Label of x axis
+        figConf["yLabel"]       = "Number of blocks"                # Label of y axis
+        figConf["axis"]         = [0, bins[-1] + self.metrics.binWidth, 0, maxCount] # Axis limits
         figConf["yGrid"]        = True                              # Enable x axis grid lines
         figConf["colors"]       = ["c", "c", "c", "g", "y", "r" ]   # Colors
         figConf["labels"]       = ["Block Delay", "4", "5", "6"]    # Labels
-        figConf["hline"]        = sum(delays)/len(delays)           # Horizontal line for average
         figConf["legCol"]       = 1                                 # Columns in the legend
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
 
     def plotUncleRate(self):
@@ -547,17 +641,16 @@ class node():
         figConf["legCol"]       = 1                                 # Columns in the legend
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
     def plotMsgs(self):
-        last = min(len(self.msgSent), len(self.msgRecv))
-        lmax = max(max(self.msgSent), max(self.msgRecv)) + 1
-        del self.msgSent[last:]
-        del self.msgRecv[last:]
+        times, sent, recv = self.metrics.messages(self.index)
+        last = times[-1] + self.metrics.width
+        lmax = max(sent.max(), recv.max()) + 1
         dataset = []
-        dataset.append(range(last))
-        dataset.append(self.msgSent)
-        dataset.append(self.msgRecv)
+        dataset.append(times.tolist())
+        dataset.append(sent.tolist())
+        dataset.append(recv.tolist())
         target = self.config.simDir+"/"+str(self.nodeID)+"-messages.png"
         figConf = getFig("plot")
         figConf["fileName"]     = target                            # Figure file name
@@ -572,5 +665,5 @@ class node():
         figConf["legCol"]       = 1                                 # Columns in the legend
         figConf["nbDatasets"]   = 2                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
@@ -0,0 +1,230 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import random
+from collections import deque
+
+
+##  This function builds the peer graph of the whole network: every node
+#   picks nbPeers distinct random peers and links are symmetric. The graph
+#   is returned as a list of dictionaries from neighbor to edge weight.
+def peerGraph(nbNodes, nbPeers, rng):
+    adjacency = [dict() for v in range(nbNodes)]
+    nbPeers = min(nbPeers, nbNodes - 1)
+    for v in range(nbNodes):
+        for u in rng.sample(range(nbNodes - 1), nbPeers):
+            if u >= v:
+                u = u + 1
+            adjacency[v][u] = 1
+            adjacency[u][v] = 1
+    return adjacency
+
+
+def partSizes(nbVertices, nbParts):
+    return [nbVertices // nbParts + (1 if p < nbVertices % nbParts else 0) for p in range(nbParts)]
+
+
+def edgeCut(adjacency, parts):
+    cut = 0
+    total = 0
+    for v, neighbors in enumerate(adjacency):
+        for u, w in neighbors.items():
+            if u > v:
+                total += w
+                if parts[u] != parts[v]:
+                    cut += w
+    return cut, total
+
+
+##  This function contracts a graph with heavy edge matching. It returns the
+#   coarse graph, its vertex weights and the coarse vertex of each vertex.
+def coarsen(adjacency, weights, maxWeight, rng):
+    n = len(adjacency)
+    cmap = [-1] * n
+    order = list(range(n))
+    rng.shuffle(order)
+    nc = 0
+    for v in order:
+        if cmap[v] != -1:
+            continue
+        best = -1
+        bestWeight = 0
+        for u, w in adjacency[v].items():
+            if cmap[u] == -1 and w > bestWeight and weights[u] + weights[v] <= maxWeight:
+                best = u
+                bestWeight = w
+        cmap[v] = nc
+        if best != -1:
+            cmap[best] = nc
+        nc += 1
+    coarse = [dict() for v in range(nc)]
+    coarseWeights = [0] * nc
+    for v in range(n):
+        cv = cmap[v]
+        coarseWeights[cv] += weights[v]
+        for u, w in adjacency[v].items():
+            cu = cmap[u]
+            if cu != cv:
+                coarse[cv][cu] = coarse[cv].get(cu, 0) + w
+    return coarse, coarseWeights, cmap
+
+
+##  This function cuts a breadth first ordering of the graph into parts of
+#   the target weights, which keeps neighbors together.
+def initialPartition(adjacency, weights, sizes, rng):
+    n = len(adjacency)
+    seen = [False] * n
+    order = []
+    starts = list(range(n))
+    rng.shuffle(starts)
+    for s in starts:
+        if seen[s]:
+            continue
+        seen[s] = True
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            order.append(v)
+            for u in adjacency[v]:
+                if not seen[u]:
+                    seen[u] = True
+                    queue.append(u)
+    parts = [0] * n
+    part = 0
+    filled = 0
+    for v in order:
+        if filled >= sizes[part] and part < len(sizes) - 1:
+            part += 1
+            filled = 0
+        parts[v] = part
+        filled += weights[v]
+    return parts
+
+
+##  This function moves boundary vertices to the neighboring part with the
+#   largest cut reduction, as long as the part weights stay within bounds.
+def refine(adjacency, weights, parts, sizes, imbalance, rng, passes=4):
+    nbParts = len(sizes)
+    partWeights = [0] * nbParts
+    for v, p in enumerate(parts):
+        partWeights[p] += weights[v]
+    order = list(range(len(adjacency)))
+    for i in range(passes):
+        rng.shuffle(order)
+        moved = 0
+        for v in order:
+            p = parts[v]
+            connections = {}
+            for u, w in adjacency[v].items():
+                connections[parts[u]] = connections.get(parts[u], 0) + w
+            internal = connections.get(p, 0)
+            best = p
+            bestGain = 0
+            for q, w in connections.items():
+                if q == p or w - internal <= bestGain:
+                    continue
+                if partWeights[q] + weights[v] > sizes[q] * (1 + imbalance):
+                    continue
+                if partWeights[p] - weights[v] < sizes[p] * (1 - imbalance):
+                    continue
+                best = q
+                bestGain = w - internal
+            if best != p:
+                parts[v] = best
+                partWeights[p] -= weights[v]
+                partWeights[best] += weights[v]
+                moved += 1
+        if moved == 0:
+            break
+    return parts
+
+
+##  This function makes the part sizes exact by moving, from each overfull
+#   part, the vertices that cost the least cut to an underfull part.
+def balance(adjacency, parts, sizes):
+    counts = [0] * len(sizes)
+    for p in parts:
+        counts[p] += 1
+    for p in range(len(sizes)):
+        while counts[p] > sizes[p]:
+            under = [q for q in range(len(sizes)) if counts[q] < sizes[q]]
+            best = None
+            for v in range(len(parts)):
+                if parts[v] != p:
+                    continue
+                connections = {}
+                for u, w in adjacency[v].items():
+                    connections[parts[u]] = connections.get(parts[u], 0) + w
+                for q in under:
+                    gain = connections.get(q, 0) - connections.get(p, 0)
+                    if best == None or gain > best[0]:
+                        best = (gain, v, q)
+            gain, v, q = best
+            parts[v] = q
+            counts[p] -= 1
+            counts[q] += 1
+    return parts
+
+
+##  This function is a multilevel min edge cut partitioner: the graph is
+#   coarsened by heavy edge matching, the coarsest graph is split in
+#   balanced parts, and the partition is projected back and refined at
+#   every level. Part sizes of the result are exact.
+#   @param  adjacency   List of dictionaries from neighbor to edge weight.
+#   @param  nbParts     Number of parts.
+#   @param  seed        Seed of the random choices.
+#   @param  imbalance   Weight imbalance allowed during refinement.
+def partitionGraph(adjacency, nbParts, seed=0, imbalance=0.05):
+    rng = random.Random(seed)
+    n = len(adjacency)
+    sizes = partSizes(n, nbParts)
+    if nbParts <= 1:
+        return [0] * n
+    levels = []
+    graph = adjacency
+    weights = [1] * n
+    maxWeight = max(1, n // (4 * nbParts))
+    while len(graph) > 16 * nbParts:
+        coarse, coarseWeights, cmap = coarsen(graph, weights, maxWeight, rng)
+        if len(coarse) > 0.9 * len(graph):
+            break
+        levels.append((graph, weights, cmap))
+        graph = coarse
+        weights = coarseWeights
+    parts = initialPartition(graph, weights, sizes, rng)
+    parts = refine(graph, weights, parts, sizes, imbalance, rng)
+    while levels:
+        graph, weights, cmap = levels.pop()
+        parts = [parts[cmap[v]] for v in range(len(graph))]
+        parts = refine(graph, weights, parts, sizes, imbalance, rng)
+    return balance(adjacency, parts, sizes)
+
+
+##  This function places the nodes of the network on ranks. It builds the
+#   peer graph, partitions it, and returns for every rank the peers of each
+#   of its nodes (with node IDs rank * maxNodesPerRank + i), and the ratio
+#   of peer links that cross ranks.
+def placeNodes(config, nbRanks, seed):
+    rng = random.Random(seed)
+    nbNodes = nbRanks * config.nodesPerRank
+    adjacency = peerGraph(nbNodes, config.nbPeers, rng)
+    parts = partitionGraph(adjacency, nbRanks, seed)
+    nodeIDs = [0] * nbNodes
+    filled = [0] * nbRanks
+    for v, p in enumerate(parts):
+        nodeIDs[v] = p * config.maxNodesPerRank + filled[p]
+        filled[p] += 1
+    peers = [[[] for i in range(config.nodesPerRank)] for r in range(nbRanks)]
+    for v, p in enumerate(parts):
+        peers[p][nodeIDs[v] - p * config.maxNodesPerRank] = sorted(nodeIDs[u] for u in adjacency[v])
+    cut, total = edgeCut(adjacency, parts)
+    return peers, float(cut) / max(total, 1)
@@ -12,9 +12,9 @@
 
 from matplotlib.colors import LogNorm
 import matplotlib.pyplot as plt
-import itertools, warnings
+from matplotlib.collections import LineCollection
+import hashlib, os
 from operator import add
-import networkx as nx
 import numpy as np
 
 
@@ -156,29 +156,96 @@ def plotData(figConf):
     plt.close(fig)
     #print("Figure "+figConf["fileName"]+" generated.")
 
-def plotNetwork(nodes, edges, nodePeers, fileName):
-    g = nx.Graph()
-    plt.figure(figsize=(25,25))
+##  This function returns a hash identifying a graph, used as layout key.
+def graphHash(nbNodes, edges, weights=None):
+    h = hashlib.sha1(str(nbNodes).encode())
+    h.update(np.ascontiguousarray(edges, dtype=np.int64).tobytes())
+    if weights is not None:
+        h.update(np.ascontiguousarray(weights, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+##  This function computes a spectral layout of a graph given as an edge
+#   list. Coordinates are the two slowest non trivial eigenvectors of the
+#   lazy random walk, found by orthogonal iteration on the sparse adjacency,
+#   so each iteration costs O(edges) and no dense matrix is built.
+#   @param  nbNodes     Number of vertices, numbered from 0.
+#   @param  edges       Array of (u, v) pairs, each edge given once.
+#   @param  weights     Weight of each edge, 1 by default.
+def sparseLayout(nbNodes, edges, weights=None, iterations=200, seed=0):
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if weights is None:
+        weights = np.ones(len(edges))
+    rows = np.concatenate((edges[:, 0], edges[:, 1]))
+    cols = np.concatenate((edges[:, 1], edges[:, 0]))
+    w = np.concatenate((weights, weights)).astype(np.float64)
+    degree = np.maximum(np.bincount(rows, weights=w, minlength=nbNodes), 1e-9)
+    x = np.random.RandomState(seed).rand(nbNodes, 2) - 0.5
+    for i in range(iterations):
+        walk = np.empty_like(x)
+        for k in range(2):
+            walk[:, k] = np.bincount(rows, weights=w * x[cols, k], minlength=nbNodes) / degree
+        x = 0.5 * (x + walk)
+        x = x - x.mean(axis=0)
+        x, r = np.linalg.qr(x)
+    x = x - x.min(axis=0)
+    return x / np.maximum(x.max(axis=0), 1e-12)
+
+
+##  This function returns the layout of a graph, read from the cache
+#   directory when the same graph was already laid out.
+def cachedLayout(nbNodes, edges, weights=None, cacheDir=None):
+    if cacheDir is None:
+        return sparseLayout(nbNodes, edges, weights)
+    path = os.path.join(cacheDir, graphHash(nbNodes, edges, weights)+".npy")
+    if os.path.exists(path):
+        return np.load(path)
+    pos = sparseLayout(nbNodes, edges, weights)
+    os.makedirs(cacheDir, exist_ok=True)
+    np.save(path, pos)
+    return pos
+
+
+def drawGraph(pos, edges, colors, widths, labels, fileName, cmap="winter"):
+    size = min(25, 8 + len(pos) / 100.0)
+    fig = plt.figure(figsize=(size, size))
     plt.axis('off')
-    for node in nodes:
-        g.add_node(node, alias=str(node))
-    edges.sort()
-    edges = list(edges for edges,_ in itertools.groupby(edges)) # Remove repeated edges
-    for edge in edges:
-            g.add_edge(edge[0], edge[1])
-    pos = nx.spring_layout(g)
-    node_labels = nx.get_node_attributes(g, 'alias')
-    nodes = g.nodes
-    edges = g.edges
-    minPeers = min(nodePeers)
-    maxPeers = max(nodePeers)
-    n = nx.draw_networkx_nodes(g, pos, nodes, node_size=250, node_color=nodePeers, cmap="winter", vmin=minPeers, vmax=maxPeers, alpha=0.9)
-    n.set_edgecolor("black")
-    warnings.filterwarnings("ignore") # To avoid annoying deprecated message from networkx
-    nx.draw_networkx_edges(g, pos, edges, alpha=1.0)
-    warnings.resetwarnings()
-    nx.draw_networkx_labels(g, pos, node_labels, font_size=8)
+    segments = pos[np.asarray(edges, dtype=np.int64).reshape(-1, 2)]
+    plt.gca().add_collection(LineCollection(segments, colors="black", linewidths=widths, alpha=0.5 if len(pos) > 200 else 1.0))
+    nodeSize = 250 if len(pos) <= 200 else max(2, 40000.0 / len(pos))
+    plt.scatter(pos[:, 0], pos[:, 1], s=nodeSize, c=colors, cmap=cmap, edgecolors="black", alpha=0.9, zorder=2)
+    if labels is not None:
+        for label, (x, y) in zip(labels, pos):
+            plt.text(x, y, label, fontsize=8, ha="center", va="center", zorder=3)
     plt.savefig(fileName)
+    plt.close(fig)
+
+
+##  This function draws the peer to peer network, one point per node
+#   colored by its number of peers.
+def plotNetwork(nodes, edges, nodePeers, fileName, cacheDir=None):
+    index = dict((nodeID, i) for i, nodeID in enumerate(nodes))
+    pairs = np.array([sorted((index[u], index[v])) for u, v in edges if u in index and v in index and u != v], dtype=np.int64).reshape(-1, 2)
+    pairs = np.unique(pairs, axis=0) # Remove repeated edges
+    pos = cachedLayout(len(nodes), pairs, None, cacheDir)
+    labels = [str(node) for node in nodes] if len(nodes) <= 200 else None
+    drawGraph(pos, pairs, nodePeers, 1.0 if len(nodes) <= 200 else 0.2, labels, fileName)
     #print("Figure "+fileName+" generated.")
 
 
+##  This function draws the network collapsed to ranks: one point per rank
+#   colored by the ratio of its peer links that stay local, and one line
+#   per pair of ranks with a width proportional to the links between them.
+#   @param  links   Matrix of the peer links from each rank to each rank.
+def plotRankNetwork(links, fileName, cacheDir=None):
+    links = np.asarray(links, dtype=np.float64)
+    both = links + links.T
+    u, v = np.nonzero(np.triu(both, 1))
+    pairs = np.stack((u, v), axis=1)
+    weights = both[u, v]
+    pos = cachedLayout(len(links), pairs, weights, cacheDir)
+    local = np.diag(links) / np.maximum(links.sum(axis=1), 1)
+    widths = 0.5 + 4.5 * weights / max(weights.max(), 1) if len(weights) else 1.0
+    drawGraph(pos, pairs, local, widths, ["R%d" % r for r in range(len(links))], fileName, cmap="RdYlGn")
+
+
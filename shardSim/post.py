@@ -0,0 +1,94 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import os, pickle, subprocess, sys
+
+
+from .plot import plotData
+
+
+# Command run by the rendering processes, given the directory of the
+# package. They are fresh interpreters that never initialize MPI, and only
+# render figures and pages from plain data.
+WORKER = ("import sys; sys.path.insert(0, sys.argv[1]); import mpi4py; mpi4py.rc.initialize = False; "
+          "from shardSim.post import serve; serve()")
+
+
+def runJob(job):
+    func, args = job
+    func(*args)
+
+
+##  This function is the main loop of a rendering process: it runs the jobs
+#   pickled on its standard input.
+def serve():
+    for job in pickle.load(sys.stdin.buffer):
+        runJob(job)
+
+
+##  This class collects the figures and pages to render during
+#   post-processing. Plot and report methods only describe their output and
+#   submit it here; it is then rendered by a local pool of processes.
+#   Figures of the whole network described on rank 0 are handed round-robin
+#   to all the ranks.
+class postPipeline():
+
+    def __init__(self, config, topo):
+        self.config = config
+        self.topo = topo
+        self.jobs = []
+        self.mark = 0
+
+    def submit(self, func, *args):
+        self.jobs.append((func, args))
+
+    def figure(self, figConf):
+        self.submit(plotData, figConf)
+
+    ##  This method marks the start of the global figures, which are
+    #   submitted by rank 0 only.
+    def startGlobal(self):
+        self.mark = len(self.jobs)
+
+    ##  This method deals the global figures of rank 0 to all the ranks.
+    def share(self):
+        shared = None
+        if self.topo.rank == 0:
+            globalJobs = self.jobs[self.mark:]
+            del self.jobs[self.mark:]
+            shared = [globalJobs[r::self.topo.nbRanks] for r in range(self.topo.nbRanks)]
+        self.jobs.extend(self.topo.comm.scatter(shared, root=0))
+
+    ##  This method renders all the figures and pages of this rank, in
+    #   parallel when postProcesses is larger than one. The rank is never
+    #   forked: the processes are new interpreters started with exec, which
+    #   is safe on every MPI transport, and the jobs are sent to them
+    #   pickled, so they only need plain data.
+    def run(self):
+        jobs = self.jobs
+        self.jobs = []
+        processes = min(self.config.postProcesses, len(jobs))
+        if processes > 1:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            workers = []
+            for p in range(processes):
+                worker = subprocess.Popen([sys.executable, "-c", WORKER, root], stdin=subprocess.PIPE)
+                pickle.dump(jobs[p::processes], worker.stdin)
+                worker.stdin.close()
+                workers.append(worker)
+            for worker in workers:
+                if worker.wait() != 0:
+                    raise RuntimeError("post-processing process failed with code %d" % worker.returncode)
+        else:
+            for job in jobs:
+                runJob(job)
+        return len(jobs)
@@ -15,7 +15,58 @@ from shutil import copyfile
 from yattag import Doc, indent
 
 
-def mainReport(net, globalPeers):
+from .block import shortHash
+
+
+##  This class holds the plain data the pages of a node are rendered from,
+#   so that they can be rendered by a process that does not share the
+#   simulation state.
+class nodePage():
+
+    def __init__(self, node, short=False):
+        metrics = node.metrics
+        self.short = short
+        self.simID = node.config.simID
+        self.simDir = node.config.simDir
+        self.nodeID = node.nodeID
+        self.peers = list(node.peers)
+        if short:
+            return
+        self.address = node.address
+        self.ether = node.ether
+        self.miner = node.miner
+        self.duplicates = int(metrics.duplicates[node.index])
+        self.dropped = int(metrics.dropped[node.index])
+        sketches = [("Block delay", metrics.delaySketch), ("Message delay", metrics.messageSketch), ("Send completion", metrics.sendSketch)]
+        self.sketches = [(name, s.mean(), s.quantile(0.5), s.quantile(0.9), s.quantile(0.99)) for name, s in sketches]
+        self.blockChain = list(node.blockChain)
+        self.uncles = node.uncles.blocks()
+        self.beaconChain = list(node.beaconChain)
+        self.shard = node.shard
+        self.shardChain = list(node.shardChain)
+        self.crosslinks = dict(node.crosslinks)
+        self.log = node.tracer.lines(node.nodeID)
+
+
+##  This function renders and writes the page and the log page of a node.
+def writeNodePages(page):
+    if page.short:
+        htmlContent = nullReport(page)
+        htmlLogContent = nullReport(page)
+    else:
+        htmlContent = nodeReport(page)
+        htmlLogContent = nodeLogReport(page)
+    fileName = page.simDir+"/"+str(page.nodeID)+".html"
+    f =  open(fileName, "w")
+    f.write(htmlContent)
+    f.close()
+    fileName = page.simDir+"/"+str(page.nodeID)+"-log.html"
+    f =  open(fileName, "w")
+    f.write(htmlLogContent)
+    f.close()
+
+
+def mainReport(net, globalNodes):
     cssPath = os.path.dirname(os.path.abspath(__file__))+"/styles.css"
     copyfile(cssPath, net.config.simDir+"/styles.css")
     doc, tag, text, line = Doc().ttl()
@@ -36,6 +87,9 @@ def mainReport(net, globalPeers):
                         line("p", "The simulation ran with a total of "+str(net.topo.nbRanks)+" MPI ranks.")
                         line("p", "Each rank simulated "+str(net.config.nodesPerRank)+" simNodes.")
                         line("p", "In total, the execution simulated "+str(nbNodes)+" simNodes.")
+                        line("p", "Nodes were placed on ranks by "+net.config.placement+", %.1f%% of the peer links cross ranks." % (100 * net.edgeCut))
+                        if net.topo.nbShards > 0:
+                            line("p", "The network was split in "+str(net.topo.nbShards)+" shards with committees of "+str(net.config.committeeSize)+" validators.")
                         line("h3", "Visualization of the P2P network")
                         with tag("a", href="net.png"):
                             doc.stag('img', src="net.png", width="900")
@@ -72,13 +126,35 @@ def mainReport(net, globalPeers):
                             doc.stag('img', src="lastBeacon.png")
 
 
+                if net.phaseTables != None:
+                    with tag('tr'):
+                        with tag('td', align="center"):
+                            with tag('h2'):
+                                text("Phase Timers")
+                            line("p", "Seconds spent by the ranks in each phase of the simulation. Times are inclusive.")
+                            with tag('table', width="900", klass="chain"):
+                                with tag('tr'):
+                                    for header in ("Phase", "Calls", "Min", "Mean", "Max", "Imbalance"):
+                                        line("td", header, klass="header")
+                                for row in net.phaseTables[0]:
+                                    with tag('tr'):
+                                        line("td", row["phase"], klass="chain")
+                                        line("td", str(row["calls"]), klass="chain")
+                                        for key in ("min", "mean", "max"):
+                                            line("td", "%.4f" % row[key], klass="chain")
+                                        line("td", "%.2f" % row["imbalance"], klass="chain")
+                            with tag("a", href="phases.csv"):
+                                text("phases.csv")
+                            text(" ")
+                            with tag("a", href="messages.csv"):
+                                text("messages.csv")
+
                 with tag('tr'):
                     with tag('td', align="center"):
                         with tag('h2'):
                             text("List of nodes")
-                        for rank in globalPeers:
-                            for node in rank:
-                                nodeID = node[0]
+                        for rank in globalNodes:
+                            for nodeID in rank:
                                 with tag("a", href=str(nodeID)+".html"):
                                     text(str(nodeID))
                         doc.stag('br')
@@ -102,7 +178,7 @@ def nullReport(node):
                     with tag('td', align="center"):
                         with tag('h1'):
                             with tag('a', href="index.html"):
-                                text("Sharding Simulation "+node.config.simID+" - Node "+str(node.nodeID))
+                                text("Sharding Simulation "+node.simID+" - Node "+str(node.nodeID))
                 with tag('tr'):
                     with tag('td', align="center"):
                         with tag('h2'):
@@ -147,13 +223,17 @@ def nodeReport(node):
                     with tag('td', align="center"):
                         with tag('h1'):
                             with tag('a', href="index.html"):
-                                text("Sharding Simulation "+node.config.simID+" - Node "+str(node.nodeID))
+                                text("Sharding Simulation "+node.simID+" - Node "+str(node.nodeID))
                 with tag('tr'):
                     with tag('td', align="center"):
                         with tag('h3'):
                             line("p", "Address : "+node.address)
                             line("p", "Ether : "+str(node.ether))
                             line("p", "Miner : "+str(node.miner))
+                            line("p", "Duplicate messages dropped : "+str(node.duplicates))
+                            line("p", "Messages dropped by a full send backlog : "+str(node.dropped))
+                        for name, mean, p50, p90, p99 in node.sketches:
+                            line("p", name+" on this rank : mean %.2f, p50 %.1f, p90 %.1f, p99 %.1f" % (mean, p50, p90, p99))
                         with tag('h2'):
                             text("Main chain")
                         if node.blockChain:
@@ -167,8 +247,8 @@ def nodeReport(node):
                                 for block in node.blockChain[::-1]:
                                     with tag('tr'):
                                         line("td", str(block.number), klass="chain")
-                                        line("td", str(block.hash[-16:]), klass="chain")
-                                        line("td", str(block.parent[-16:]), klass="chain")
+                                        line("td", shortHash(block.hash, 16), klass="chain")
+                                        line("td", shortHash(block.parent, 16), klass="chain")
                                         line("td", str(block.miner), klass="chain")
                                         line("td", str(block.time), klass="chain")
                         else:
@@ -188,8 +268,8 @@ def nodeReport(node):
                                 for block in node.uncles[::-1]:
                                     with tag('tr'):
                                         line("td", str(block.number), klass="chain")
-                                        line("td", str(block.hash[-16:]), klass="chain")
-                                        line("td", str(block.parent[-16:]), klass="chain")
+                                        line("td", shortHash(block.hash, 16), klass="chain")
+                                        line("td", shortHash(block.parent, 16), klass="chain")
                                         line("td", str(block.miner), klass="chain")
                                         line("td", str(block.time), klass="chain")
                         else:
@@ -209,12 +289,51 @@ def nodeReport(node):
                                 for block in node.beaconChain[::-1]:
                                     with tag('tr'):
                                         line("td", str(block.number), klass="chain")
-                                        line("td", str(block.hash[-16:]), klass="chain")
-                                        line("td", str(block.parent[-16:]), klass="chain")
+                                        line("td", shortHash(block.hash, 16), klass="chain")
+                                        line("td", shortHash(block.parent, 16), klass="chain")
                                         line("td", str(block.miner), klass="chain")
                                         line("td", str(block.time), klass="chain")
                         else:
                             text("No beacon blocks.")
+                if node.shard >= 0:
+                    with tag('tr'):
+                        with tag('td', align="center"):
+                            with tag('h2'):
+                                text("Shard "+str(node.shard)+" Chain")
+                            with tag('table', width="900", klass="chain"):
+                                with tag('tr'):
+                                    line("td", "Number", klass="header")
+                                    line("td", "Hash", klass="header")
+                                    line("td", "Parent", klass="header")
+                                    line("td", "Miner", klass="header")
+                                    line("td", "Time", klass="header")
+                                for block in node.shardChain[::-1]:
+                                    with tag('tr'):
+                                        line("td", str(block.number), klass="chain")
+                                        line("td", shortHash(block.hash, 16), klass="chain")
+                                        line("td", shortHash(block.parent, 16), klass="chain")
+                                        line("td", str(block.miner), klass="chain")
+                                        line("td", str(block.time), klass="chain")
+                    with tag('tr'):
+                        with tag('td', align="center"):
+                            with tag('h2'):
+                                text("Crosslinks")
+                            if node.crosslinks:
+                                with tag('table', width="900", klass="chain"):
+                                    with tag('tr'):
+                                        line("td", "Beacon block", klass="header")
+                                        line("td", "Shard", klass="header")
+                                        line("td", "Number", klass="header")
+                                        line("td", "Hash", klass="header")
+                                    for block in node.beaconChain[::-1]:
+                                        for shard, number, h in block.crosslinks:
+                                            with tag('tr'):
+                                                line("td", str(block.number), klass="chain")
+                                                line("td", str(shard), klass="chain")
+                                                line("td", str(number), klass="chain")
+                                                line("td", shortHash(h, 16), klass="chain")
+                            else:
+                                text("No crosslinks.")
 
                 with tag('tr'):
                     with tag('td', align="center"):
@@ -272,10 +391,10 @@ def nodeLogReport(node):
                     with tag('td', align="center"):
                         with tag('h1'):
                             with tag('a', href="index.html"):
-                                text("Sharding Simulation "+node.config.simID+" - Node "+str(node.nodeID)+" log")
+                                text("Sharding Simulation "+node.simID+" - Node "+str(node.nodeID)+" log")
                 with tag('tr'):
                     with tag('td', align="left"):
-                        for l in node.logs:
+                        for l in node.log:
                             line("p", l)
 
                 with tag('tr'):
@@ -0,0 +1,145 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import json, os
+from mpi4py import MPI
+import numpy as np
+
+
+RESULTS_FILE = "results.bin"
+MANIFEST_FILE = "results.json"
+
+# Tables of the results file
+ARRIVAL = np.dtype([("node", "<i4"), ("status", "<i1"), ("number", "<i8"), ("hash", "S32"), ("parent", "S32"),
+                    ("miner", "<i4"), ("time", "<i4"), ("arrivalTime", "<i4")])
+PEER = np.dtype([("node", "<i4"), ("peer", "<i4")])
+TIP = np.dtype([("node", "<i4"), ("number", "<i8"), ("hash", "S32"), ("beaconNumber", "<i8"), ("shardNumber", "<i8")])
+
+
+def messageType(nbBuckets):
+    return np.dtype([("node", "<i4"), ("sent", "<i4", (nbBuckets,)), ("recv", "<i4", (nbBuckets,))])
+
+
+##  Hashes are stored little endian, so the trailing zeros numpy strips from
+#   S32 values are the high bytes and hashOf still returns the hash.
+def hashBytes(h):
+    return h.to_bytes(32, "little")
+
+
+def hashOf(value):
+    return int.from_bytes(value, "little")
+
+
+##  This class streams the results of the simulation into one file shared by
+#   all the ranks. Records are buffered per rank and appended every
+#   resultsInterval ticks with a collective write, each rank at the offset
+#   given by an exclusive scan of the sizes. Rank 0 keeps a manifest with the
+#   type and the chunks of every table, so results can be read back without
+#   the simulator.
+class resultsStore():
+
+    def __init__(self, config, topo):
+        self.config = config
+        self.topo = topo
+        self.fileName = config.simDir+"/"+RESULTS_FILE
+        self.file = None
+        self.end = 0
+        self.arrivals = []
+        self.tables = {}
+
+    def open(self):
+        if not self.config.resultsFile:
+            return
+        self.file = MPI.File.Open(self.topo.comm, self.fileName, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        self.file.Set_size(0)
+
+    ##  This method records the arrival of a main chain block at a node.
+    def blockArrived(self, node, b, status):
+        if self.file != None:
+            self.arrivals.append((node.nodeID, status, b.number, hashBytes(b.hash), hashBytes(b.parent), b.miner, b.time, b.arrivalTime))
+
+    ##  This method appends the records of every rank to a table of the file.
+    #   It is collective, all the ranks must call it in the same order.
+    def write(self, name, dtype, records):
+        data = np.ascontiguousarray(records, dtype=dtype).view(np.uint8).reshape(-1)
+        offset = self.topo.comm.exscan(data.size)
+        if self.topo.rank == 0:
+            offset = 0
+        self.file.Write_at_all(self.end + offset, [data, MPI.BYTE])
+        chunks = self.topo.comm.gather((self.end + offset, len(records)), root=0)
+        self.end += self.topo.comm.allreduce(data.size)
+        if self.topo.rank == 0:
+            table = self.tables.setdefault(name, {"dtype": dtype.descr, "chunks": []})
+            table["chunks"].extend([c for c in chunks if c[1] > 0])
+
+    ##  This method appends the block arrivals buffered since the last flush.
+    def flush(self):
+        if self.file == None:
+            return
+        records = np.array(self.arrivals, dtype=ARRIVAL)
+        self.arrivals = []
+        self.write("arrivals", ARRIVAL, records)
+
+    ##  This method writes the final state of the nodes and the manifest,
+    #   and closes the file.
+    def close(self, net):
+        if self.file == None:
+            return
+        self.flush()
+        peers = [(n.nodeID, p) for n in net.nodes for p in n.peers]
+        self.write("peers", PEER, np.array(peers, dtype=PEER))
+        tips = [(n.nodeID, n.blockChain[-1].number, hashBytes(n.blockChain[-1].hash),
+                 n.beaconChain[-1].number if n.beaconChain else -1, n.shardChain[-1].number if n.shardChain else -1) for n in net.nodes]
+        self.write("tips", TIP, np.array(tips, dtype=TIP))
+        metrics = net.metrics
+        messages = np.zeros(len(net.nodes), dtype=messageType(metrics.nbBuckets))
+        messages["node"] = net.nodeIDs
+        messages["sent"] = metrics.sent[:len(net.nodes)]
+        messages["recv"] = metrics.recv[:len(net.nodes)]
+        self.write("messages", messages.dtype, messages)
+        self.file.Close()
+        self.file = None
+        if self.topo.rank == 0:
+            manifest = {"file": RESULTS_FILE, "simID": self.config.simID, "ranks": self.topo.nbRanks,
+                        "bucketWidth": metrics.width, "tables": self.tables}
+            with open(self.config.simDir+"/"+MANIFEST_FILE, "w") as f:
+                json.dump(manifest, f, indent=1)
+
+
+def dtypeOf(descr):
+    return np.dtype([tuple(tuple(x) if isinstance(x, list) else x for x in field) for field in descr])
+
+
+##  This function reads the manifest of the results of a simulation.
+def loadManifest(simDir):
+    with open(os.path.join(simDir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+##  This function reads one table of the results of a simulation and returns
+#   it as a NumPy structured array, e.g. loadTable("data/<simID>", "arrivals").
+def loadTable(simDir, name, manifest=None):
+    if manifest == None:
+        manifest = loadManifest(simDir)
+    table = manifest["tables"][name]
+    dtype = dtypeOf(table["dtype"])
+    parts = [np.fromfile(os.path.join(simDir, manifest["file"]), dtype=dtype, count=count, offset=offset)
+             for offset, count in table["chunks"]]
+    if not parts:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(parts)
+
+
+##  This function reads all the tables of the results of a simulation.
+def loadResults(simDir):
+    manifest = loadManifest(simDir)
+    return dict((name, loadTable(simDir, name, manifest)) for name in manifest["tables"])
@@ -0,0 +1,48 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+from .tools import getShuffle, splitCommittees, shardCommittees
+
+
+##  This class caches the committees of each epoch for all the nodes of a
+#   rank. The shuffle is computed once per (epoch, seed) and the beacon and
+#   shard committees are shared read-only as tuples. Only the last few
+#   epochs are kept.
+class epochSchedule():
+
+    def __init__(self, config, topo, keep=2):
+        self.config = config
+        self.topo = topo
+        self.keep = keep
+        self.epochs = {}
+
+    def shardOf(self, nodeID):
+        return self.topo.shardOfRank(nodeID // self.config.maxNodesPerRank)
+
+    def entry(self, epoch, seed, validators):
+        key = (epoch, seed, len(validators))
+        if key not in self.epochs:
+            vl = getShuffle(validators, seed)
+            committees = tuple(tuple(c) for c in splitCommittees(vl, self.config.epochLength))
+            shards = ()
+            if self.topo.nbShards > 0:
+                shards = tuple(tuple(c) for c in shardCommittees(vl, self.shardOf, self.topo.nbShards, self.config.committeeSize))
+            self.epochs[key] = (committees, shards)
+            for old in [k for k in self.epochs if k[0] <= epoch - self.keep]:
+                del self.epochs[old]
+        return self.epochs[key]
+
+    def committees(self, epoch, seed, validators):
+        return self.entry(epoch, seed, validators)[0]
+
+    def shardCommittees(self, epoch, seed, validators):
+        return self.entry(epoch, seed, validators)[1]
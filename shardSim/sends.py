@@ -0,0 +1,125 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+from collections import deque
+from time import perf_counter
+from mpi4py import MPI
+
+
+from . import timers, trace
+from .wire import encode
+
+
+##  This class tracks the point to point sends of all the nodes of a rank.
+#   Requests in flight are kept in one array and completed together with
+#   Testsome. A node has at most maxOutQueue requests in flight; further
+#   messages wait, already encoded, in a backlog of maxBacklog messages, and
+#   the oldest one is dropped and counted when the backlog is full. The
+#   event driven engine needs every message sent within its window, so
+#   its sends are never held back.
+class sendQueue():
+
+    def __init__(self, config, net):
+        self.config = config
+        self.net = net
+        self.state = net.state
+        self.metrics = net.metrics
+        self.limit = max(config.maxOutQueue, 1)
+        self.bounded = not config.eventDriven
+        self.requests = []
+        self.owners = []
+        self.times = []
+        self.backlog = [deque() for i in range(config.maxNodesPerRank)]
+        self.waiting = set()
+
+    def __len__(self):
+        return len(self.requests) + sum(len(self.backlog[i]) for i in self.waiting)
+
+    ##  This method sends a message of a node, or holds it in the backlog
+    #   of the node if too many of its messages are in flight.
+    def send(self, node, ch, rank, target, message):
+        i = node.index
+        data = encode(target, message)
+        if self.bounded and (self.state.queued[i] >= self.limit or i in self.waiting):
+            backlog = self.backlog[i]
+            if len(backlog) >= self.config.maxBacklog:
+                backlog.popleft()
+                self.metrics.messageDropped(i)
+                node.trace(trace.LOST_MESSAGES, len(backlog), self.metrics.dropped[i])
+            backlog.append((ch, rank, target, data, node.time))
+            self.waiting.add(i)
+            return
+        self.post(i, ch, rank, target, data, node.time)
+
+    def post(self, i, ch, rank, target, data, time):
+        self.requests.append(ch.isendBytes(rank, target, data))
+        self.owners.append(i)
+        self.times.append(time)
+        self.state.queued[i] += 1
+
+    ##  This method sends a message on behalf of the rank, outside of the
+    #   bounds of any node.
+    def forward(self, ch, rank, target, message, time):
+        self.requests.append(ch.isend(rank, target, message))
+        self.owners.append(-1)
+        self.times.append(time)
+
+    ##  This method completes the requests that are done, records their
+    #   latency in ticks and sends the backlogs of the nodes that have room
+    #   again.
+    def progress(self, time):
+        start = perf_counter()
+        if self.requests:
+            done = MPI.Request.Testsome(self.requests)
+            if done:
+                done = set(done)
+                requests = []
+                owners = []
+                times = []
+                for k in range(len(self.requests)):
+                    if k in done:
+                        if self.owners[k] >= 0:
+                            self.state.queued[self.owners[k]] -= 1
+                        self.metrics.sendCompleted(time - self.times[k])
+                    else:
+                        requests.append(self.requests[k])
+                        owners.append(self.owners[k])
+                        times.append(self.times[k])
+                self.requests = requests
+                self.owners = owners
+                self.times = times
+        for i in sorted(self.waiting):
+            backlog = self.backlog[i]
+            while backlog and self.state.queued[i] < self.limit:
+                self.post(i, *backlog.popleft())
+            if not backlog:
+                self.waiting.discard(i)
+        self.metrics.queueSampled(time, len(self))
+        self.net.timers.add(timers.SEND_PROGRESS, start)
+
+    ##  This method sends every message held in the backlogs.
+    def flush(self):
+        for i in sorted(self.waiting):
+            backlog = self.backlog[i]
+            while backlog:
+                self.post(i, *backlog.popleft())
+        self.waiting = set()
+
+    ##  This method waits for all the requests in flight.
+    def wait(self, time):
+        MPI.Request.Waitall(self.requests)
+        for k in range(len(self.requests)):
+            self.metrics.sendCompleted(time - self.times[k])
+        self.requests = []
+        self.owners = []
+        self.times = []
+        self.state.queued[:] = 0
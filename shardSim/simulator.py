@@ -15,19 +15,29 @@ from mpi4py import MPI
 
 
 from .network import network
+from .checkpoint import writeCheckpoint, readCheckpoint, checkpointPath
+from .balance import rebalance
 from .configuration import configuration
 from .topology import topology
 from .report import mainReport
-from .plot import getFig, plotData
+from .plot import getFig
+from .metrics import quantileSketch
+from . import timers
 
 class simulator():
 
-    def __init__(self):
-        config = configuration()
-        topo = topology()
+    ##  Constructor of the simulator.
+    #   @param  comm        Communicator of the ranks running this simulation.
+    #   @param  overrides   Dictionary of settings replacing the defaults.
+    def __init__(self, comm=None, overrides=None):
+        config = configuration(comm, overrides)
+        topo = topology(comm)
         self.config = config
         self.topo = topo
+        self.config.verify()
+        self.topo.splitShards(self.config.nbShards)
         self.timeResolution = 1.0/self.config.timeSpeed
+        self.runTime = 0.0
         random.seed(topo.rank*time.time())
         self.log("Simulator initialized", 1)
 
@@ -39,45 +49,176 @@ class simulator():
 
     def bootstrap(self):
         self.net = network(self.config, self.topo)
-        self.net.bootstrap()
+        if self.config.restartFrom:
+            readCheckpoint(self.net, self.config.restartFrom)
+            self.log("Simulation restarted at time %d from %s" % (self.net.time, self.config.restartFrom), 1)
+        else:
+            self.net.bootstrap()
         if self.topo.rank == 0:
             if not os.path.exists(self.config.resultsDir):
                 os.makedirs(self.config.resultsDir)
             if not os.path.exists(self.config.simDir):
                 os.makedirs(self.config.simDir)
         self.topo.comm.barrier()
+        self.net.results.open()
+        self.log("Peer links crossing ranks : %.1f%% (%s placement)" % (100 * self.net.edgeCut, self.config.placement), 1)
         self.log("Simulator bootstrap executed", 1)
 
 
     def run(self):
+        if self.config.eventDriven:
+            return self.runEvents()
         start = time.time()
-        for i in range(self.config.simTime):
+        for i in range(self.net.time, self.config.simTime):
             beforeTick = time.time()
+            phase = time.perf_counter()
             self.net.tick()
+            self.net.timers.add(timers.TICK, phase)
             afterTick = time.time()
             tickTime = afterTick - beforeTick
             self.log("Tick time took %f seconds" % (tickTime), 3)
-            if (i % self.config.syncTime) == 0:
+            if (i + 1) % self.config.resultsInterval == 0:
+                phase = time.perf_counter()
+                self.net.results.flush()
+                self.net.timers.add(timers.RESULTS, phase)
+            if self.rebalanceDue(i + 1):
+                phase = time.perf_counter()
+                migrated = rebalance(self.net)
+                self.net.timers.add(timers.REBALANCE, phase)
+                if migrated > 0:
+                    self.log("%d nodes migrated at time %d" % (migrated, i + 1), 1)
+            if self.checkpointDue(i + 1):
+                self.checkpoint()
+            if (i % self.config.syncTime) == 0 and not self.config.aggregateMsgs:
+                phase = time.perf_counter()
                 self.topo.comm.barrier()
-            if (self.timeResolution > tickTime):
+                self.net.timers.add(timers.BARRIER, phase)
+            if self.timeResolution > tickTime and not self.config.linkModel:
                 time.sleep((1.0/self.config.timeSpeed) - (tickTime))
             else:
                 pass
                 #self.log("WARNING! Tick time (%f) longer than time resolution (%f)" % (tickTime, self.timeResolution), 1)
 
         self.topo.comm.barrier()
+        self.net.results.close(self.net)
+        self.reduceTimers()
         end = time.time()
+        self.runTime = end - start
         self.log("Simulation executed in %f seconds" % (end-start), 1)
 
+    ##  Event-driven version of run(). Instead of stepping every node on every
+    #   tick, ranks agree on the earliest pending event and process all the
+    #   events inside the next lookahead window, as fast as possible.
+    def runEvents(self):
+        start = time.time()
+        if self.net.time == 0:
+            self.net.schedule()
+        self.net.exchange()
+        windows = 0
+        nextFlush = self.net.time + self.config.resultsInterval
+        nextCheckpoint = self.net.time + self.config.checkpointInterval
+        while True:
+            nextTime = min(self.net.events.nextTime(), self.net.mining.nextTime())
+            phase = time.perf_counter()
+            nextTime = self.topo.comm.allreduce(nextTime, op=MPI.MIN)
+            self.net.timers.add(timers.BARRIER, phase)
+            if nextTime >= self.config.simTime:
+                break
+            horizon = min(nextTime + self.config.lookahead, self.config.simTime)
+            self.net.advance(horizon)
+            self.net.exchange()
+            windows += 1
+            if horizon >= nextFlush:
+                phase = time.perf_counter()
+                self.net.results.flush()
+                self.net.timers.add(timers.RESULTS, phase)
+                nextFlush = horizon + self.config.resultsInterval
+            if self.config.checkpointInterval > 0 and horizon >= nextCheckpoint and horizon < self.config.simTime:
+                self.net.time = horizon
+                self.checkpoint()
+                nextCheckpoint = horizon + self.config.checkpointInterval
+        for node in self.net.nodes:
+            node.time = self.config.simTime
+        self.topo.comm.barrier()
+        self.net.results.close(self.net)
+        self.reduceTimers()
+        end = time.time()
+        self.runTime = end - start
+        self.log("Simulation executed in %f seconds (%d windows)" % (end-start, windows), 1)
+
+    def rebalanceDue(self, time):
+        interval = self.config.rebalanceInterval
+        return interval > 0 and time % interval == 0 and time < self.config.simTime
+
+    def checkpointDue(self, time):
+        interval = self.config.checkpointInterval
+        return interval > 0 and time % interval == 0 and time < self.config.simTime
+
+    ##  This method writes a checkpoint of all the ranks at the current
+    #   virtual time, from which a later run can restart with restartFrom.
+    def checkpoint(self):
+        start = time.time()
+        phase = time.perf_counter()
+        directory = checkpointPath(self.config, self.net.time)
+        writeCheckpoint(self.net, directory)
+        self.net.timers.add(timers.CHECKPOINT, phase)
+        self.log("Checkpoint written in %s in %f seconds" % (directory, time.time()-start), 1)
+
+    ##  This method reduces the phase timers and message counters of all the
+    #   ranks and writes their tables in the simulation directory. The
+    #   tables stay in the network for the report.
+    def reduceTimers(self):
+        tables = self.net.timers.reduce(self.topo.comm)
+        if tables != None:
+            if not os.path.exists(self.config.simDir):
+                os.makedirs(self.config.simDir)
+            timers.writeTables(self.config.simDir, *tables)
+            self.net.phaseTables = tables
+            phases = tables[0]
+            for row in sorted(phases, key=lambda r: -r["max"])[:5]:
+                self.log("Phase %-16s max %f seconds, imbalance %.2f" % (row["phase"], row["max"], row["imbalance"]), 2)
+
+    ##  This method reduces the main metrics of the simulation over all its
+    #   ranks. It is collective and returns a dictionary on rank 0 only.
+    def summary(self):
+        nodes = self.net.nodes
+        metrics = self.net.metrics
+        counts = (len(nodes),
+                  sum(n.blockChain[-1].number - n.blockChain[0].number for n in nodes),
+                  sum(len(n.beaconChain) for n in nodes),
+                  int(metrics.recv.sum()),
+                  int(metrics.duplicates.sum()),
+                  int(metrics.dropped.sum()),
+                  int(metrics.queueDepth.max()))
+        gathered = self.topo.comm.gather((counts, metrics.delaySketch, metrics.messageSketch, metrics.sendSketch), root=0)
+        if self.topo.rank != 0:
+            return None
+        nbNodes, blocks, beacons, messages, duplicates, dropped = [sum(c[i] for c, d, m, s in gathered) for i in range(6)]
+        queueDepth = max(c[6] for c, d, m, s in gathered)
+        delaySketch = quantileSketch()
+        messageSketch = quantileSketch()
+        sendSketch = quantileSketch()
+        for c, d, m, s in gathered:
+            delaySketch.merge(d)
+            messageSketch.merge(m)
+            sendSketch.merge(s)
+        return {"simID": self.config.simID, "ranks": self.topo.nbRanks, "nodes": nbNodes,
+                "mainBlocks": float(blocks) / max(nbNodes, 1), "beaconBlocks": float(beacons) / max(nbNodes, 1),
+                "messages": messages, "duplicates": duplicates, "dropped": dropped, "queueDepth": queueDepth, "edgeCut": self.net.edgeCut,
+                "blockDelayMean": delaySketch.mean(), "blockDelayP50": delaySketch.quantile(0.5),
+                "blockDelayP90": delaySketch.quantile(0.9), "blockDelayP99": delaySketch.quantile(0.99),
+                "messageDelayMean": messageSketch.mean(), "messageDelayP90": messageSketch.quantile(0.9),
+                "sendLatencyMean": sendSketch.mean(), "sendLatencyP90": sendSketch.quantile(0.9),
+                "runTime": self.runTime}
+
     def postProcess(self):
         start = time.time()
         first = True
-        peerList = []
         lastBlock = []
         lastBeacon = []
         self.log("Generating reports. This might take a few minutes...", 1)
+        self.net.tracer.flush()
         for node in self.net.nodes:
-            peerList.append([node.nodeID, node.peers])
             lastBlock.append(node.blockChain[-1].number - node.blockChain[0].number)
             lastBeacon.append(node.beaconChain[-1].number - node.beaconChain[0].number)
             if first:
@@ -87,26 +228,31 @@ class simulator():
                 node.report()
                 if self.config.shortReport:
                     first = False
-            else:
+            elif self.config.nodeReports:
                 node.report(short=1)
 
         fileName = ""
-        globalPeers = self.topo.comm.gather(peerList, root=0)
+        summary = self.net.gatherP2P()
         lb = self.topo.comm.gather(lastBlock, root=0)
         le = self.topo.comm.gather(lastBeacon, root=0)
         self.log("Nodes reports generated.", 1)
+        self.net.post.startGlobal()
         if self.topo.rank == 0:
-            self.net.plotP2P(globalPeers)
+            self.net.plotP2P(summary)
             lastBlock = [item for sublist in lb for item in sublist]
             lastBeacon = [item for sublist in le for item in sublist]
             self.plotLastBlock(lastBlock)
             self.plotLastBeacon(lastBeacon)
-            observer = random.randint(0, self.config.nodesPerRank-1)
+            observer = random.randint(0, len(self.net.nodes)-1)
             self.net.nodes[observer].plotBlockTimes()
             self.net.nodes[observer].plotBeaconTimes()
             self.net.nodes[observer].plotBeaconMiners()
             self.net.nodes[observer].plotUncleRate()
-            htmlContent = mainReport(self.net, globalPeers)
+        self.net.post.share()
+        nbFigures = self.topo.comm.allreduce(self.net.post.run())
+        self.log("%d figures and pages rendered." % nbFigures, 1)
+        if self.topo.rank == 0:
+            htmlContent = mainReport(self.net, [rankNodes for rankNodes, counts, links, edges in summary])
             fileName = self.config.simDir+"/index.html"
             f =  open(fileName, "w")
             f.write(htmlContent)
@@ -135,7 +281,7 @@ class simulator():
         figConf["legLoc"]       = 3                                 # Legend location
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
     def plotLastBeacon(self, lastBlock):
         dataset = []
@@ -155,5 +301,5 @@ class simulator():
         figConf["legLoc"]       = 3                                 # Legend location
         figConf["nbDatasets"]   = 1                                 # Number of datasets
         figConf["datasets"]     = dataset                           # Datasets
-        plotData(figConf)
+        self.net.post.figure(figConf)
 
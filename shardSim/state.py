@@ -0,0 +1,63 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import numpy as np
+
+
+##  This function returns a node attribute stored in the rank state, so that
+#   node code keeps reading and writing self.time, self.slot, etc.
+def field(name):
+    def get(self):
+        return getattr(self.state, name).item(self.index)
+    def set(self, value):
+        getattr(self.state, name)[self.index] = value
+    return property(get, set)
+
+
+##  This class holds the scalar state of all the nodes of a rank as arrays,
+#   one entry per node, so the network can advance them all at once.
+class rankState():
+
+    ##  Constructor of the state.
+    #   @param  nbNodes Number of nodes hosted by the rank.
+    def __init__(self, nbNodes):
+        self.time = np.zeros(nbNodes, dtype=np.int64)
+        self.slot = np.zeros(nbNodes, dtype=np.int64)
+        self.epoch = np.zeros(nbNodes, dtype=np.int64)
+        self.seed = np.zeros(nbNodes, dtype=np.int64)
+        self.committeeSeed = np.zeros(nbNodes, dtype=np.int64)
+        self.miner = np.zeros(nbNodes, dtype=bool)
+        self.val = np.zeros(nbNodes, dtype=bool)
+        self.pending = np.zeros(nbNodes, dtype=np.int64)
+        self.queued = np.zeros(nbNodes, dtype=np.int64)
+        self.cost = np.zeros(nbNodes, dtype=np.float64)
+
+    ##  This method advances the slot of every validator and the epoch of
+    #   the ones that start a new epoch. It returns the index of the
+    #   validators that need new committees.
+    def advanceSlots(self, epochLength):
+        self.slot[self.val] += 1
+        boundary = self.val & (self.slot % epochLength == 0)
+        self.epoch[boundary] += 1
+        return np.nonzero(boundary)[0]
+
+    ##  This method groups the validators of the current epoch by the seed
+    #   their committees were drawn with. It returns a list of (epoch, seed,
+    #   indexes), one entry per group.
+    def committeeGroups(self):
+        active = np.nonzero(self.val & (self.epoch > 0))[0]
+        if len(active) == 0:
+            return []
+        keys = np.stack((self.epoch[active], self.committeeSeed[active]), axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        return [(int(e), int(s), active[inverse == g]) for g, (e, s) in enumerate(unique)]
@@ -0,0 +1,52 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+##  This class indexes a set of blocks by hash and by number, so that
+#   membership, parent and height lookups are O(1). Iteration follows the
+#   order in which blocks were added.
+class blockStore():
+
+    def __init__(self):
+        self.byHash = {}
+        self.byNumber = {}
+
+    def __len__(self):
+        return len(self.byHash)
+
+    def __contains__(self, h):
+        return h in self.byHash
+
+    def __iter__(self):
+        return iter(self.byHash.values())
+
+    def blocks(self):
+        return list(self.byHash.values())
+
+    def add(self, b):
+        self.byHash[b.hash] = b
+        self.byNumber.setdefault(b.number, []).append(b)
+
+    def remove(self, b):
+        del self.byHash[b.hash]
+        height = self.byNumber[b.number]
+        height.remove(b)
+        if not height:
+            del self.byNumber[b.number]
+
+    def get(self, h):
+        return self.byHash.get(h)
+
+    def parent(self, b):
+        return self.byHash.get(b.parent)
+
+    def atHeight(self, number):
+        return self.byNumber.get(number, [])
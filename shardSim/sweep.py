@@ -0,0 +1,130 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import csv, datetime, itertools, os, sys
+from mpi4py import MPI
+import numpy as np
+
+
+from .simulator import simulator
+
+
+##  This function returns the list of settings of every combination of the
+#   given values, e.g. grid(nbPeers=[4, 8], minerSlot=[8, 16]).
+def grid(**params):
+    keys = sorted(params)
+    return [dict(zip(keys, values)) for values in itertools.product(*[params[k] for k in keys])]
+
+
+##  This class runs many simulations in one MPI job. The ranks are split
+#   into groups of the size asked by each run, with a "ranks" entry in its
+#   settings, and groups take the next run from a shared counter on rank 0
+#   until all the runs of that size are done. The summary of every run is
+#   collected in one CSV table.
+class sweep():
+
+    ##  Constructor of the sweep.
+    #   @param  runs            List of dictionaries of settings, one per run.
+    #   @param  ranksPerRun     Number of ranks of the runs without "ranks".
+    #   @param  postProcess     Generate the full report of every run.
+    #   @param  fileName        CSV file of the summaries.
+    def __init__(self, runs, ranksPerRun=4, postProcess=False, fileName=None, comm=None):
+        self.comm = comm if comm != None else MPI.COMM_WORLD
+        self.rank = self.comm.Get_rank()
+        self.nbRanks = self.comm.Get_size()
+        self.runs = [dict(r) for r in runs]
+        self.ranksPerRun = ranksPerRun
+        self.postProcess = postProcess
+        sweepID = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.sweepID = self.comm.bcast(sweepID, root=0)
+        self.fileName = fileName if fileName != None else "data/sweep-"+self.sweepID+".csv"
+        self.rows = []
+
+    def log(self, msg):
+        if self.rank == 0:
+            print(" ** Sharding Sweep ** : " + msg)
+            sys.stdout.flush()
+
+    ##  This method groups the runs by number of ranks, as a list of
+    #   (ranks, [(run index, settings), ...]) by increasing size.
+    def batches(self):
+        sizes = {}
+        for k, run in enumerate(self.runs):
+            ranks = run.pop("ranks", self.ranksPerRun)
+            if ranks > self.nbRanks:
+                self.log("WARNING : run %d asks for %d ranks, using %d" % (k, ranks, self.nbRanks))
+                ranks = self.nbRanks
+            sizes.setdefault(ranks, []).append((k, run))
+        return [(ranks, sizes[ranks]) for ranks in sorted(sizes)]
+
+    ##  This method runs all the simulations and returns the table of
+    #   summaries on rank 0.
+    def run(self):
+        batches = self.batches()
+        counters = np.zeros(len(batches) if self.rank == 0 else 0, dtype="i8")
+        win = MPI.Win.Create(counters, counters.itemsize, comm=self.comm)
+        for b, (ranks, batch) in enumerate(batches):
+            self.log("%d runs on groups of %d ranks" % (len(batch), ranks))
+            color = self.rank // ranks if self.rank < (self.nbRanks // ranks) * ranks else MPI.UNDEFINED
+            group = self.comm.Split(color, self.rank)
+            if group != MPI.COMM_NULL:
+                self.runBatch(win, b, batch, group)
+                group.Free()
+            self.comm.barrier()
+        win.Free()
+        rows = self.comm.gather(self.rows, root=0)
+        if self.rank != 0:
+            return None
+        rows = sorted([row for rankRows in rows for row in rankRows], key=lambda row: row["run"])
+        self.write(rows)
+        self.log("%d runs summarized in %s" % (len(rows), self.fileName))
+        return rows
+
+    ##  This method takes runs of a batch from the shared counter until the
+    #   batch is empty. The first rank of the group draws the next run.
+    def runBatch(self, win, b, batch, group):
+        one = np.ones(1, dtype="i8")
+        taken = np.zeros(1, dtype="i8")
+        while True:
+            if group.Get_rank() == 0:
+                win.Lock(0)
+                win.Fetch_and_op(one, taken, 0, b, MPI.SUM)
+                win.Unlock(0)
+            i = group.bcast(int(taken[0]), root=0)
+            if i >= len(batch):
+                return
+            k, settings = batch[i]
+            overrides = dict(settings)
+            overrides.setdefault("simID", "%s_run%03d" % (self.sweepID, k))
+            sim = simulator(group, overrides)
+            sim.bootstrap()
+            sim.run()
+            if self.postProcess:
+                sim.postProcess()
+            summary = sim.summary()
+            if summary != None:
+                row = {"run": k}
+                row.update(settings)
+                row.update(summary)
+                self.rows.append(row)
+
+    def write(self, rows):
+        fields = []
+        for row in rows:
+            fields.extend([f for f in row if f not in fields])
+        directory = os.path.dirname(self.fileName)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.fileName, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
@@ -0,0 +1,117 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import csv
+from time import perf_counter
+
+
+from .wire import HEADERS
+
+
+# Phases of the simulation timed on every rank. Times are inclusive, so
+# broadcast also counts in send and classify in listen.
+PHASES = ["tick", "listen", "classify", "mine", "validate", "propose", "send", "broadcast",
+          "send progress", "dispatch", "collect", "release", "advance", "exchange", "barrier",
+          "results", "checkpoint", "rebalance"]
+
+(TICK, LISTEN, CLASSIFY, MINE, VALIDATE, PROPOSE, SEND, BROADCAST, SEND_PROGRESS, DISPATCH,
+ COLLECT, RELEASE, ADVANCE, EXCHANGE, BARRIER, RESULTS, CHECKPOINT, REBALANCE) = range(len(PHASES))
+
+PHASES_FILE = "phases.csv"
+MESSAGES_FILE = "messages.csv"
+
+
+##  This class accumulates the time spent by a rank in each phase of the
+#   simulation, the time spent classifying each type of message, the
+#   messages and bytes sent and received per type, and the messages that
+#   reached classification after the duplicates were dropped. Phases are timed with
+#   perf_counter into plain lists, cheap enough to stay always on.
+class phaseTimers():
+
+    def __init__(self):
+        self.times = [0.0] * len(PHASES)
+        self.calls = [0] * len(PHASES)
+        self.headerTimes = [0.0] * len(HEADERS)
+        self.sent = [0] * len(HEADERS)
+        self.sentBytes = [0] * len(HEADERS)
+        self.received = [0] * len(HEADERS)
+        self.receivedBytes = [0] * len(HEADERS)
+        self.classifiedCount = [0] * len(HEADERS)
+
+    ##  This method adds the time elapsed since start to a phase.
+    def add(self, phase, start):
+        self.times[phase] += perf_counter() - start
+        self.calls[phase] += 1
+
+    ##  This method adds the time elapsed since start to the classification
+    #   of a message type.
+    def classified(self, code, start):
+        elapsed = perf_counter() - start
+        self.times[CLASSIFY] += elapsed
+        self.calls[CLASSIFY] += 1
+        self.headerTimes[code] += elapsed
+        self.classifiedCount[code] += 1
+
+    ##  This method counts a message sent, with the bytes it takes on the
+    #   wire, zero if it stays on the rank.
+    def messageSent(self, code, size):
+        self.sent[code] += 1
+        self.sentBytes[code] += size
+
+    ##  This method counts a message arriving at the rank, before duplicates
+    #   are dropped, with the bytes it took on the wire.
+    def messageReceived(self, code, size):
+        self.received[code] += 1
+        self.receivedBytes[code] += size
+
+    ##  This method reduces the timers of all the ranks. It is collective
+    #   and returns on rank 0 the rows of the phase table and of the message
+    #   table, None elsewhere.
+    def reduce(self, comm):
+        gathered = comm.gather((self.times, self.calls, self.headerTimes, self.sent, self.sentBytes,
+                                self.received, self.receivedBytes, self.classifiedCount), root=0)
+        if gathered == None:
+            return None
+        phases = []
+        names = PHASES + ["classify " + h for h in HEADERS]
+        for p, name in enumerate(names):
+            if p < len(PHASES):
+                times = [g[0][p] for g in gathered]
+                calls = sum(g[1][p] for g in gathered)
+            else:
+                times = [g[2][p - len(PHASES)] for g in gathered]
+                calls = sum(g[7][p - len(PHASES)] for g in gathered)
+            if calls == 0:
+                continue
+            mean = sum(times) / len(times)
+            phases.append({"phase": name, "calls": calls, "min": min(times), "mean": mean, "max": max(times),
+                           "imbalance": max(times) / mean if mean > 0 else 1.0})
+        messages = []
+        for code, header in enumerate(HEADERS):
+            sent = sum(g[3][code] for g in gathered)
+            received = sum(g[5][code] for g in gathered)
+            if sent or received:
+                messages.append({"header": header, "sent": sent, "sentBytes": sum(g[4][code] for g in gathered),
+                                 "received": received, "receivedBytes": sum(g[6][code] for g in gathered),
+                                 "classified": sum(g[7][code] for g in gathered)})
+        return phases, messages
+
+
+##  This function writes the reduced tables next to the report.
+def writeTables(simDir, phases, messages):
+    for fileName, rows in ((PHASES_FILE, phases), (MESSAGES_FILE, messages)):
+        if not rows:
+            continue
+        with open(simDir+"/"+fileName, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
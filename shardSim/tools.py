@@ -11,15 +11,12 @@
 
 
 
+import numpy as np
 
 
 def getShuffle(list, seed):
-    l = list.copy()
-    new = []
-    while (l):
-        index = seed % len(l)
-        new.append(l.pop(index))
-    return new
+    order = np.random.RandomState(seed).permutation(len(list))
+    return [list[i] for i in order]
 
 
 def splitCommittees(list, epochLength):
@@ -31,3 +28,12 @@ def splitCommittees(list, epochLength):
         new.append(l[index:index+nbValPerSlot])
         index = index + nbValPerSlot
     return new
+
+
+def shardCommittees(list, shardOf, nbShards, committeeSize):
+    new = [[] for s in range(nbShards)]
+    for v in list:
+        committee = new[shardOf(v)]
+        if len(committee) < committeeSize:
+            committee.append(v)
+    return new
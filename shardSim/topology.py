@@ -15,9 +15,32 @@ from mpi4py import MPI
 
 class topology():
 
-    def __init__(self):
-        self.comm = MPI.COMM_WORLD
+    def __init__(self, comm=None):
+        if comm == None:
+            comm = MPI.COMM_WORLD
+        self.comm = comm
         self.rank = self.comm.Get_rank()
         self.nbRanks = self.comm.Get_size()
+        self.nbShards = 0
+        self.shard = -1
+        self.shardComm = None
+        self.shardRanks = []
+
+    ##  This method splits the ranks into nbShards groups of consecutive ranks
+    #   and creates the sub-communicator of the shard hosted by this rank.
+    def splitShards(self, nbShards):
+        if nbShards > self.nbRanks:
+            if self.rank == 0:
+                print("WARNING : more shards than ranks, simulating %d shards" % self.nbRanks)
+            nbShards = self.nbRanks
+        self.nbShards = nbShards
+        if nbShards <= 0:
+            return
+        self.shard = self.shardOfRank(self.rank)
+        self.shardComm = self.comm.Split(self.shard, self.rank)
+        self.shardRanks = self.shardComm.allgather(self.rank)
+
+    def shardOfRank(self, rank):
+        return rank * self.nbShards // self.nbRanks
 
 
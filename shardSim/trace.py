@@ -0,0 +1,168 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import gzip, os, random, sys
+import numpy as np
+
+
+from .block import shortHash
+from .wire import HEADERS
+
+
+# Trace events, with their level and text. Arguments are integers, %h is
+# rendered as a block hash and %m as a message header.
+EVENTS = [
+    (2, "List of peers created."),
+    (2, "Node bootstrap executed."),
+    (1, "WARNING : Not enough validators"),
+    (2, "Beacon : parent %h number %d time %d"),
+    (1, "I have mined beacon block %h number %d at time %d"),
+    (2, "I have mined shard %d block %h number %d at time %d"),
+    (1, "TOO MANY FAILED MESSAGES!!! Out queue length: %d, lost messages: %d"),
+    (3, "Message sent to node %d in rank %d"),
+    (3, "Message %m from node %d received from rank %d"),
+    (2, "New main block %h number %d received"),
+    (2, "Blockchain reorganized with block %h"),
+    (2, "Uncle block %h number %d received at time %d"),
+    (1, "WARNING : Parent of block number %d unknown, node seems out of sync"),
+    (3, "Adding %d as peer"),
+    (1, "Block %d was requested by peer %d"),
+    (3, "Block %h already known"),
+    (3, "Block %h already in the beacon chain"),
+    (3, "New beacon block %h number %d received"),
+    (3, "New beacon block %h number %d overwriting past block (or placeholder)"),
+    (1, "WARNING : Uncle beacon block received"),
+    (2, "WARNING : Beacon chain seems out of sync"),
+    (3, "Adding %d as shard peer"),
+    (3, "Block %h already in the shard chain"),
+    (3, "New shard block %h number %d received"),
+    (2, "WARNING : Stale shard block number %d received"),
+    (3, "New crosslink for shard %d at block number %d received"),
+    (3, "Adding %d as validator"),
+    (1, "I have mined block %h number %d at time %d"),
+    (3, "Crosslink for shard %d at block number %d added to the beacon chain"),
+]
+
+(PEERS_CREATED, BOOTSTRAPPED, FEW_VALIDATORS, BEACON_PARENT, MINED_BEACON, MINED_SHARD, LOST_MESSAGES,
+ MSG_SENT, MSG_RECEIVED, NEW_BLOCK, REORGANIZED, UNCLE_BLOCK, UNKNOWN_PARENT, NEW_PEER, BLOCK_REQUESTED,
+ KNOWN_BLOCK, KNOWN_BEACON, NEW_BEACON, BEACON_OVERWRITE, UNCLE_BEACON, BEACON_SYNC, NEW_SHARD_PEER,
+ KNOWN_SHARD, NEW_SHARD_BLOCK, STALE_SHARD, NEW_CROSSLINK, NEW_VALIDATOR, MINED_BLOCK,
+ LINKED_CROSSLINK) = range(len(EVENTS))
+
+MAX_ARGS = 4
+HASH_MASK = (1 << 63) - 1
+
+# Layout of a trace record, also used in the trace files
+RECORD = np.dtype([("event", "<u2"), ("node", "<i4"), ("time", "<i4"), ("args", "<i8", MAX_ARGS)])
+
+
+def render(event, args):
+    level, text = EVENTS[event]
+    parts = text.split("%")
+    line = parts[0]
+    for i, part in enumerate(parts[1:]):
+        kind = part[0]
+        if kind == "h":
+            value = shortHash(int(args[i]))
+        elif kind == "m":
+            value = HEADERS[int(args[i])]
+        else:
+            value = str(int(args[i]))
+        line = line + value + part[1:]
+    return line
+
+
+##  This class records the trace events of the nodes of a rank in a bounded
+#   ring buffer. Events above the trace level are dropped before anything
+#   is formatted, and text is only rendered for the console and reports.
+#   When the buffer is full it is appended to a compressed file of the rank,
+#   or overwritten if trace files are disabled.
+class tracer():
+
+    def __init__(self, config, topo):
+        self.config = config
+        self.topo = topo
+        self.size = max(config.traceSize, 1)
+        self.buffer = np.zeros(self.size, dtype=RECORD)
+        self.events = self.buffer["event"]
+        self.nodeIDs = self.buffer["node"]
+        self.times = self.buffer["time"]
+        self.args = self.buffer["args"]
+        self.position = 0
+        self.wrapped = False
+        self.flushed = 0
+        self.loaded = None
+        self.fileName = config.simDir+"/trace-%d.bin.gz" % topo.rank
+        self.kinds = [[part[0] for part in text.split("%")[1:]] for level, text in EVENTS]
+        self.printed = [level <= config.verbosity for level, text in EVENTS]
+        self.kept = [level <= config.traceLevel for level, text in EVENTS]
+        self.active = [p or k for p, k in zip(self.printed, self.kept)]
+        self.nodes = set(config.traceNodes)
+
+    ##  This method tells whether the events of a node are recorded: only
+    #   the listed nodes if any, otherwise a stable sample of the nodes.
+    def traces(self, nodeID):
+        if self.nodes:
+            return nodeID in self.nodes
+        if self.config.traceSample >= 1:
+            return True
+        return random.Random(nodeID).random() < self.config.traceSample
+
+    def record(self, event, nodeID, time, args, traced=True):
+        if self.printed[event]:
+            print(("[%05d] : " % nodeID) + render(event, args))
+            sys.stdout.flush()
+        if not (traced and self.kept[event]):
+            return
+        p = self.position
+        self.events[p] = event
+        self.nodeIDs[p] = nodeID
+        self.times[p] = time
+        kinds = self.kinds[event]
+        for i in range(len(args)):
+            self.args[p, i] = args[i] & HASH_MASK if kinds[i] == "h" else args[i]
+        self.position = p + 1
+        if self.position == self.size:
+            if self.config.traceFile:
+                self.flush()
+            else:
+                self.position = 0
+                self.wrapped = True
+
+    ##  This method appends the records in the buffer to the trace file.
+    def flush(self):
+        if not self.config.traceFile or self.position == 0:
+            return
+        os.makedirs(self.config.simDir, exist_ok=True)
+        with gzip.open(self.fileName, "ab") as f:
+            f.write(self.buffer[:self.position].tobytes())
+        self.flushed += self.position
+        self.position = 0
+        self.loaded = None
+
+    ##  This method returns all the records of the rank, oldest first.
+    def records(self):
+        if self.loaded is None:
+            parts = []
+            if self.flushed > 0:
+                with gzip.open(self.fileName, "rb") as f:
+                    parts.append(np.frombuffer(f.read(), dtype=RECORD))
+            if self.wrapped:
+                parts.append(self.buffer[self.position:])
+            parts.append(self.buffer[:self.position])
+            self.loaded = np.concatenate(parts)
+        return self.loaded
+
+    ##  This method renders the trace of a node as lines of text.
+    def lines(self, nodeID):
+        records = self.records()
+        return ["[%05d] : %s" % (r["time"], render(r["event"], r["args"])) for r in records[records["node"] == nodeID]]
@@ -0,0 +1,137 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+# Results of blockTree.add, from the least to the most significant change
+KNOWN = 0
+ORPHAN = 1
+UNCLE = 2
+EXTENDED = 3
+REORG = 4
+
+
+##  This class keeps every block received by a node as a tree and maintains
+#   the best chain incrementally. Blocks on the best chain live in the chain
+#   container, all the others in the uncles store, and blocks whose parent
+#   is still unknown wait in the orphans pool. A reorganization only touches
+#   the blocks of the fork segment.
+class blockTree():
+
+    ##  Constructor of the tree.
+    #   @param  chain       Best chain container with the genesis block.
+    #   @param  uncles      Block store for the blocks off the best chain.
+    #   @param  forkChoice  "longest" or "ghost" (heaviest subtree).
+    #   @param  finality    Depth after which GHOST weights stop being updated.
+    def __init__(self, chain, uncles, forkChoice="longest", finality=64):
+        self.chain = chain
+        self.uncles = uncles
+        self.forkChoice = forkChoice
+        self.finality = finality
+        self.parent = {}
+        self.children = {}
+        self.weight = {}
+        self.orphans = {}
+        self.orphanHashes = set()
+        genesis = chain[0]
+        self.base = genesis.number
+        self.parent[genesis.hash] = genesis.parent
+        self.children[genesis.hash] = []
+        self.weight[genesis.hash] = 1
+
+    def known(self, h):
+        return h in self.parent or h in self.orphanHashes
+
+    def get(self, h):
+        b = self.uncles.get(h)
+        if b == None:
+            b = self.chain.get(h)
+        return b
+
+    def add(self, b):
+        if self.known(b.hash):
+            return KNOWN
+        if b.parent not in self.parent:
+            self.orphans.setdefault(b.parent, []).append(b)
+            self.orphanHashes.add(b.hash)
+            return ORPHAN
+        status = self.attach(b)
+        pending = self.orphans.pop(b.hash, [])
+        while pending:
+            orphan = pending.pop()
+            self.orphanHashes.discard(orphan.hash)
+            status = max(status, self.attach(orphan))
+            pending.extend(self.orphans.pop(orphan.hash, []))
+        return status
+
+    def attach(self, b):
+        self.parent[b.hash] = b.parent
+        self.children[b.hash] = []
+        self.children[b.parent].append(b.hash)
+        self.weight[b.hash] = 1
+        if self.forkChoice == "ghost":
+            self.addWeight(b.parent)
+        if b.parent == self.chain[-1].hash:
+            self.chain.append(b)
+            return EXTENDED
+        self.uncles.add(b)
+        if self.forkChoice == "ghost":
+            fork = self.forkPoint(b.hash)
+            if fork == None:
+                return UNCLE
+            index = self.uncles.get(fork).number - self.base
+            if index >= len(self.chain) or self.weight[fork] > self.weight[self.chain[index].hash]:
+                self.reorg(self.heaviestLeaf(fork))
+                return REORG
+            return UNCLE
+        if b.number > self.chain[-1].number:
+            self.reorg(b.hash)
+            return REORG
+        return UNCLE
+
+    ##  This method adds one to the subtree weight of h and its ancestors,
+    #   up to the finality depth.
+    def addWeight(self, h):
+        depth = 0
+        while h in self.weight and depth <= self.finality:
+            self.weight[h] += 1
+            h = self.parent[h]
+            depth += 1
+
+    ##  This method returns the first block of the branch of h that is off
+    #   the best chain, or None if the branch forks deeper than finality.
+    def forkPoint(self, h):
+        depth = 0
+        while not self.chain.has(self.parent[h]):
+            h = self.parent[h]
+            depth += 1
+            if depth > self.finality:
+                return None
+        return h
+
+    def heaviestLeaf(self, h):
+        while self.children[h]:
+            h = max(self.children[h], key=self.weight.get)
+        return h
+
+    ##  This method makes the branch ending at h the best chain. Blocks above
+    #   the common ancestor go to the uncles, the fork segment leaves them.
+    def reorg(self, h):
+        segment = []
+        while not self.chain.has(h):
+            segment.append(h)
+            h = self.parent[h]
+        ancestor = self.chain.get(h).number - self.base
+        while len(self.chain) > ancestor + 1:
+            self.uncles.add(self.chain.pop())
+        for h in reversed(segment):
+            b = self.uncles.get(h)
+            self.uncles.remove(b)
+            self.chain.append(b)
@@ -0,0 +1,82 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+##  This class holds timestamped items in a hierarchical timing wheel. Each
+#   level has 2^slotBits slots, level 0 one tick per slot and every next
+#   level 2^slotBits times longer. Items far in the future wait in a higher
+#   level and cascade down when the wheel reaches their slot, so adding an
+#   item and advancing one tick are O(1).
+class timingWheel():
+
+    def __init__(self, start=0, slotBits=8, levels=3):
+        self.bits = slotBits
+        self.mask = (1 << slotBits) - 1
+        self.levels = levels
+        self.slots = [[[] for s in range(1 << slotBits)] for l in range(levels)]
+        self.overflow = []
+        self.ready = []
+        self.now = start
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    ##  This method adds an item due at the given time. Items due now or in
+    #   the past are returned by the next call to advance.
+    def add(self, time, item):
+        self.count += 1
+        self.place(time, item)
+
+    def place(self, time, item):
+        if time <= self.now:
+            self.ready.append(item)
+            return
+        for level in range(self.levels):
+            shift = self.bits * (level + 1)
+            if (time >> shift) == (self.now >> shift):
+                self.slots[level][(time >> (self.bits * level)) & self.mask].append((time, item))
+                return
+        self.overflow.append((time, item))
+
+    ##  This method moves the wheel forward to the given time and returns
+    #   all the items due until then, in order of time.
+    def advance(self, time):
+        due = self.ready
+        self.ready = []
+        while self.now < time:
+            self.now += 1
+            self.cascade()
+            if self.ready:
+                due.extend(self.ready)
+                self.ready = []
+            slot = self.slots[0][self.now & self.mask]
+            if slot:
+                due.extend(item for t, item in slot)
+                del slot[:]
+        self.count -= len(due)
+        return due
+
+    ##  This method moves down the items of the higher level slots starting
+    #   at the current time, from the highest level to the lowest.
+    def cascade(self):
+        if self.now & ((1 << (self.bits * self.levels)) - 1) == 0:
+            overflow = self.overflow
+            self.overflow = []
+            for time, item in overflow:
+                self.place(time, item)
+        for level in range(self.levels - 1, 0, -1):
+            if self.now & ((1 << (self.bits * level)) - 1) == 0:
+                slot = self.slots[level][(self.now >> (self.bits * level)) & self.mask]
+                entries = list(slot)
+                del slot[:]
+                for time, item in entries:
+                    self.place(time, item)
@@ -0,0 +1,148 @@
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+##==============================================================================
+##
+## Copyright (C) 2018-2019 Leonardo A. Bautista Gomez (leobago@gmail.com)
+## ShardSim - This is a Sharding Simulator to study blockchain scalability.
+##
+##==============================================================================
+##* * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+## * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+
+import struct
+
+
+from .block import block
+
+
+# Message headers, the position in the list is the code sent on the wire
+HEADERS = ["New peer", "Need main block", "New main block", "New beacon block", "New validator",
+           "New shard peer", "New shard block", "New crosslink"]
+CODES = dict((header, code) for code, header in enumerate(HEADERS))
+
+# Messages carried by the sub-communicator of a shard
+SHARD_HEADERS = ("New shard peer", "New shard block")
+
+# Fixed layout of a message: header, message ID, source, target, time,
+# requested number, shard, block flag, block record (number, hash, parent,
+# miner, time) and number of crosslinks carried by the block. SIZE is the
+# size of a message without crosslinks.
+RECORD = struct.Struct("<Bqiiiqh?q32s32siiH")
+SIZE = RECORD.size
+EMPTY = bytes(32)
+
+# Crosslink (shard, shard block number, shard block hash) appended after
+# the record of a beacon block, once per crosslink
+LINK = struct.Struct("<hq32s")
+COUNT = struct.Struct("<H")
+
+# Leading fields of a message, read before decoding the rest
+PEEK = struct.Struct("<Bqii")
+
+ID_MASK = (1 << 63) - 1
+
+
+##  This function returns the ID of a gossiped message, the same for all
+#   the copies of a block or validator announcement relayed between nodes,
+#   or 0 for messages that are not gossiped.
+def messageID(message):
+    code = CODES[message["header"]]
+    b = message.get("block")
+    if b is not None:
+        return ((b.hash << 3) | code) & ID_MASK
+    if code == 4:
+        return ((message["source"] + 1) << 3) | code
+    return 0
+
+
+def hashToBytes(h):
+    return h.to_bytes(32, "big")
+
+
+def bytesToHash(b):
+    return int.from_bytes(b, "big")
+
+
+##  This function returns the number of bytes a message takes on the wire.
+def size(message):
+    b = message.get("block")
+    if b is None:
+        return SIZE
+    return SIZE + LINK.size * len(b.crosslinks)
+
+
+##  This function returns the number of bytes of the encoded message
+#   starting at offset.
+def recordSize(buf, offset=0):
+    return SIZE + LINK.size * COUNT.unpack_from(buf, offset + SIZE - COUNT.size)[0]
+
+
+def encode(target, message):
+    b = message.get("block")
+    if b is None:
+        return RECORD.pack(CODES[message["header"]], messageID(message), message["source"], target, message["time"],
+                           message.get("number", 0), message.get("shard", -1), False, 0, EMPTY, EMPTY, 0, 0, 0)
+    data = RECORD.pack(CODES[message["header"]], messageID(message), message["source"], target, message["time"],
+                       message.get("number", 0), message.get("shard", -1), True, b.number, hashToBytes(b.hash), hashToBytes(b.parent),
+                       b.miner, b.time, len(b.crosslinks))
+    if not b.crosslinks:
+        return data
+    return data + b"".join(LINK.pack(shard, number, hashToBytes(h)) for shard, number, h in b.crosslinks)
+
+
+def unpack(fields, buf=None, offset=0):
+    header, msgID, source, target, time, number, shard, hasBlock, bNumber, bHash, bParent, bMiner, bTime, nbLinks = fields
+    message = {"header": HEADERS[header], "source": source, "time": time}
+    if header == 1:
+        message["number"] = number
+    if shard >= 0:
+        message["shard"] = shard
+    if hasBlock:
+        b = block.__new__(block)
+        b.number = bNumber
+        b.hash = bytesToHash(bHash)
+        b.parent = bytesToHash(bParent)
+        b.miner = bMiner
+        b.time = bTime
+        b.arrivalTime = -1
+        b.crosslinks = ()
+        if nbLinks > 0:
+            b.crosslinks = tuple((s, n, bytesToHash(h)) for s, n, h in
+                                 (LINK.unpack_from(buf, offset + SIZE + k * LINK.size) for k in range(nbLinks)))
+        message["block"] = b
+    return target, message
+
+
+##  This function decodes one message and returns its target and content.
+#   When accept is given, it is called with the target, the header code,
+#   the message ID and the size of the message first, and the message is
+#   only decoded if it returns True, otherwise its content is None.
+def decode(buf, offset=0, accept=None):
+    if accept != None:
+        header, msgID, source, target = PEEK.unpack_from(buf, offset)
+        if not accept(target, header, msgID, recordSize(buf, offset)):
+            return target, None
+    return unpack(RECORD.unpack_from(buf, offset), buf, offset)
+
+
+##  This function decodes a buffer of concatenated messages, skipping the
+#   ones refused by accept.
+def decodeAll(buf, accept=None):
+    offset = 0
+    while offset < len(buf):
+        target, message = decode(buf, offset, accept)
+        if message != None:
+            yield target, message
+        offset += recordSize(buf, offset)
+
+
+##  This function returns the number of messages in a buffer of
+#   concatenated messages.
+def countAll(buf):
+    count = 0
+    offset = 0
+    while offset < len(buf):
+        count += 1
+        offset += recordSize(buf, offset)
+    return count